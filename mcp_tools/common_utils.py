@@ -12,14 +12,87 @@ from pathlib import Path
 from typing import Optional, Dict, Any, List, Callable, Tuple
 import asyncio
 import re
+import threading
+import time
 import uuid
+import hashlib
+import tempfile
+from datetime import datetime
 import pandas as pd
+from collections import OrderedDict
 from contextlib import redirect_stdout, contextmanager
 
+# 可选依赖：安装 orjson 后用于加速JSON读写，未安装时回退到标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 可选依赖：安装 python-calamine 后使用 Rust 实现的 calamine 引擎读取Excel，未安装时使用 pandas 默认引擎（openpyxl）
+try:
+    import python_calamine  # noqa: F401
+    _EXCEL_ENGINE: Optional[str] = "calamine"
+except ImportError:
+    _EXCEL_ENGINE = None
+
+# JSON 文件读写缓冲区大小（64KB），减少大文件读写时的系统调用次数
+_JSON_IO_BUFFER_SIZE = 1 << 16
+
+
+def _read_json_file(file_path: str) -> Any:
+    """读取JSON文件，优先使用 orjson 解析，未安装时回退到标准库 json"""
+    if orjson is not None:
+        with open(file_path, 'rb', buffering=_JSON_IO_BUFFER_SIZE) as f:
+            return orjson.loads(f.read())
+    with open(file_path, 'r', encoding='utf-8', buffering=_JSON_IO_BUFFER_SIZE) as f:
+        return json.load(f)
+
 # SiliconFlow 默认模型（可通过环境变量 SF_MODEL 覆盖）
 # 若要查看可用的模型，请前往 https://docs.siliconflow.cn/cn/api-reference/chat-completions/chat-completions
 SF_DEFAULT_MODEL = os.getenv("SF_MODEL", "deepseek-ai/DeepSeek-V3.1")
 
+# LLM 请求遇到 429 速率限制时的最大重试次数与单次等待上限（秒）
+_LLM_RATE_LIMIT_MAX_RETRIES = 5
+_LLM_RATE_LIMIT_MAX_DELAY = 30.0
+
+
+def _retry_after_seconds(retry_after: Optional[str], attempt: int) -> float:
+    """计算429重试前的等待秒数：优先使用响应头 Retry-After，否则按 0.5×2^attempt 指数退避"""
+    try:
+        delay = float(retry_after) if retry_after else 0.5 * (2 ** attempt)
+    except ValueError:
+        delay = 0.5 * (2 ** attempt)  # Retry-After 为HTTP日期格式时按指数退避处理
+    return min(max(delay, 0.0), _LLM_RATE_LIMIT_MAX_DELAY)
+
+
+# LLM 请求固定使用的采样温度（同时参与响应缓存键的计算）
+_LLM_TEMPERATURE = 0.2
+
+# LLM 响应磁盘缓存模式（通过环境变量 LLM_CACHE_MODE 设置，默认 enabled）：
+#   enabled     命中直接返回；未命中时调用API并写入缓存
+#   read_only   命中直接返回；未命中时调用API但不写入
+#   replay      只读缓存；未命中时报错，不发起API调用（离线复现）
+#   write_only  不读缓存；总是调用API并写入（刷新缓存）
+#   disabled    不读也不写
+_LLM_CACHE_MODES = ("enabled", "read_only", "replay", "write_only", "disabled")
+
+# LLM 响应缓存容量：最多保留的条目数与条目有效期（天），过期条目视为未命中，写入时清理超出部分
+_LLM_CACHE_MAX_ENTRIES = 1000
+_LLM_CACHE_MAX_AGE_DAYS = 30
+
+
+def _env_positive_int(name: str) -> Optional[int]:
+    """读取正整数环境变量；未设置、非法或非正数时返回 None"""
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        print(f"[RateLimit] ignore invalid {name}={raw!r}", file=sys.stderr, flush=True)
+        return None
+    return value if value > 0 else None
+
 
 class MCPToolsConfig:
     """MCP工具配置管理器"""
@@ -111,6 +184,35 @@ class APIManager:
                 self._deepseek_headers_cache = {"Authorization": f"Bearer {self.deepseek_api_key}"}
             return self._deepseek_headers_cache
     
+    def resolve_endpoint_and_model(self, model: Optional[str] = None,
+                                   endpoint: Optional[str] = None) -> Tuple[str, str]:
+        """解析实际使用的端点与模型：未指定端点时使用SiliconFlow，未指定模型时按端点选择默认模型"""
+        use_endpoint = endpoint or self.sf_endpoint
+        if "siliconflow" in use_endpoint:
+            return use_endpoint, model or SF_DEFAULT_MODEL
+        return use_endpoint, model or self.deepseek_model
+
+    async def _post_with_rate_limit_retry(self, session: aiohttp.ClientSession, url: str,
+                                          payload: Dict[str, Any],
+                                          headers: Dict[str, str]) -> aiohttp.ClientResponse:
+        """
+        发送POST请求；遇到429速率限制时按 Retry-After 或指数退避等待后重试，
+        重试次数用尽后返回最后一次响应，由调用方按状态码处理
+        """
+        for attempt in range(_LLM_RATE_LIMIT_MAX_RETRIES + 1):
+            resp = await session.post(url, json=payload, headers=headers, timeout=300)
+            if resp.status != 429 or attempt == _LLM_RATE_LIMIT_MAX_RETRIES:
+                return resp
+            retry_delay = _retry_after_seconds(resp.headers.get("Retry-After"), attempt)
+            resp.release()
+            print(
+                f"[API] rate limited (429), retry {attempt + 1}/{_LLM_RATE_LIMIT_MAX_RETRIES} in {retry_delay:.1f}s",
+                file=sys.stderr,
+                flush=True,
+            )
+            await asyncio.sleep(retry_delay)
+        return resp
+
     async def call_llm(self, prompt: str, 
                       session: aiohttp.ClientSession, 
                       model: Optional[str] = None, 
@@ -201,22 +303,15 @@ class APIManager:
             - DeepSeek API建议根据使用场景设置temperature: 代码生成0.0，数据分析1.0，通用对话1.3
             - SiliconFlow API默认包含额外参数: top_p=0.7, frequency_penalty=0.5
             - 请求超时时间设置为300秒
+            - 遇到429速率限制时按 Retry-After 或指数退避自动重试（最多5次）
             - 系统自动处理不同API的请求格式差异
         """
         # 确定使用的端点和模型
-        use_endpoint = endpoint or self.sf_endpoint
+        use_endpoint, use_model = self.resolve_endpoint_and_model(model, endpoint)
         
         # 判断是否为硅基流动API
         is_siliconflow = "siliconflow" in use_endpoint
         is_deepseek = "deepseek" in use_endpoint
-        
-        # 确定使用的模型
-        if is_siliconflow:
-            use_model = model or SF_DEFAULT_MODEL
-        elif is_deepseek:
-            use_model = model or self.deepseek_model
-        else:
-            use_model = model or self.deepseek_model
             
         payload = {}
         headers = {}
@@ -240,7 +335,7 @@ class APIManager:
                 "messages": [{"role": "user", "content": prompt}],
                 "stream": False,
                 "max_tokens": max_tokens,
-                "temperature": 0.2,
+                "temperature": _LLM_TEMPERATURE,
                 "top_p": 0.7,
                 "frequency_penalty": 0.5,
                 "n": 1,
@@ -257,11 +352,13 @@ class APIManager:
                 "model": use_model,
                 "messages": [{"role": "user", "content": prompt}],
                 "max_tokens": max_tokens,
-                "temperature": 0.2,
+                "temperature": _LLM_TEMPERATURE,
             }
         
         try:
-            async with session.post(f"{use_endpoint}/chat/completions", json=payload, headers=headers, timeout=300) as resp:
+            async with await self._post_with_rate_limit_retry(
+                session, f"{use_endpoint}/chat/completions", payload, headers
+            ) as resp:
                 if resp.status != 200:
                     error_text = await resp.text()
                     
@@ -360,14 +457,179 @@ class APIManager:
             raise RuntimeError(f"解析{api_name} API响应失败: {str(e)}。响应内容: {str(js)[:400]}")
 
 
+class ResponseCache:
+    """
+    LLM响应磁盘缓存 - 以 SHA256(提示词+模型+温度+max_tokens) 为键，每个键保存为 local_data/llm_cache 下的一个JSON文件
+
+    只保存响应文本与请求参数（不保存提示词原文）；条目超过有效期视为未命中，
+    写入时清理过期条目，并按修改时间只保留最新的 _LLM_CACHE_MAX_ENTRIES 条。
+    """
+
+    def __init__(self, config: MCPToolsConfig, mode: Optional[str] = None):
+        self.cache_dir = config.local_data_path / "llm_cache"
+        mode = (mode or os.getenv("LLM_CACHE_MODE") or "enabled").strip().lower().replace("-", "_")
+        if mode not in _LLM_CACHE_MODES:
+            print(f"[LLMCache] unknown LLM_CACHE_MODE={mode!r}, fallback to 'enabled'", file=sys.stderr, flush=True)
+            mode = "enabled"
+        self.mode = mode
+
+    @property
+    def readable(self) -> bool:
+        """当前模式是否读取缓存"""
+        return self.mode in ("enabled", "read_only", "replay")
+
+    @property
+    def writable(self) -> bool:
+        """当前模式是否写入缓存"""
+        return self.mode in ("enabled", "write_only")
+
+    @staticmethod
+    def make_key(prompt: str, model: str, max_tokens: int, temperature: float = _LLM_TEMPERATURE) -> str:
+        """计算缓存键：各字段以空字符分隔后整体取 SHA256，避免字段拼接产生歧义"""
+        hasher = hashlib.sha256()
+        for part in (prompt, model, repr(float(temperature)), str(int(max_tokens))):
+            hasher.update(part.encode("utf-8"))
+            hasher.update(b"\x00")
+        return hasher.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存的响应文本；未命中、当前模式不读缓存或缓存文件损坏时返回 None"""
+        if not self.readable:
+            return None
+        entry_path = self._entry_path(key)
+        try:
+            if time.time() - entry_path.stat().st_mtime > _LLM_CACHE_MAX_AGE_DAYS * 86400:
+                return None
+            entry = _read_json_file(str(entry_path))
+            response = entry["response"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[LLMCache] ignore broken cache entry {key[:12]}: {e}", file=sys.stderr, flush=True)
+            return None
+        return response if isinstance(response, str) else None
+
+    def put(self, key: str, response: str, model: str, max_tokens: int,
+            temperature: float = _LLM_TEMPERATURE) -> None:
+        """写入一条缓存（先写临时文件再原子替换，并发写同一键时不会产生半截文件）；写入失败只打印警告"""
+        if not self.writable:
+            return
+        entry = {
+            "key": key,
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "response": response,
+        }
+        tmp_path = None
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.cache_dir), prefix=f".{key[:12]}.", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._entry_path(key))
+        except OSError as e:
+            print(f"[LLMCache] failed to write cache entry {key[:12]}: {e}", file=sys.stderr, flush=True)
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._prune()
+
+    def discard(self, key: str) -> None:
+        """删除一条缓存（如命中的响应无法解析），当前模式不写缓存时不做处理"""
+        if not self.writable:
+            return
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    def _prune(self) -> None:
+        """删除过期条目；条目数超过上限时按修改时间删除最旧的条目"""
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for e in it:
+                    if e.name.endswith(".json") and not e.name.startswith("."):
+                        try:
+                            entries.append((e.stat().st_mtime, e.path))
+                        except OSError:
+                            continue  # 已被并发清理
+        except OSError:
+            return
+        expire_before = time.time() - _LLM_CACHE_MAX_AGE_DAYS * 86400
+        entries.sort(reverse=True)
+        for rank, (mtime, path) in enumerate(entries):
+            if rank >= _LLM_CACHE_MAX_ENTRIES or mtime < expire_before:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+class TokenBucket:
+    """
+    LLM请求令牌桶限流器 - 同时按每分钟请求数（RPM）与每分钟token数（TPM）限流
+
+    两个桶按速率连续回填、容量为一分钟的额度；acquire 时先预扣额度（允许扣成负数），
+    再按欠额和回填速率算出等待时间并异步等待。预扣在同一事件循环内同步完成，无需加锁，
+    并发请求按调用顺序排队。rpm/tpm 为 None 时不限制对应维度，两者都为 None 时不限流。
+    """
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.request_tokens = float(rpm or 0)
+        self.token_tokens = float(tpm or 0)
+        self.last_update = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.rpm or self.tpm)
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """为一次预计消耗 estimated_tokens 个token的请求申请额度，额度不足时等待至回填足够"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        elapsed = now - self.last_update
+        self.last_update = now
+
+        wait_time = 0.0
+        if self.rpm:
+            refill_rate = self.rpm / 60.0
+            self.request_tokens = min(float(self.rpm), self.request_tokens + elapsed * refill_rate) - 1
+            if self.request_tokens < 0:
+                wait_time = -self.request_tokens / refill_rate
+        if self.tpm:
+            refill_rate = self.tpm / 60.0
+            # 单次请求超过整桶容量时按整桶计，避免永远等不到
+            cost = min(max(int(estimated_tokens), 0), self.tpm)
+            self.token_tokens = min(float(self.tpm), self.token_tokens + elapsed * refill_rate) - cost
+            if self.token_tokens < 0:
+                wait_time = max(wait_time, -self.token_tokens / refill_rate)
+
+        if wait_time > 0:
+            print(f"[RateLimit] waiting {wait_time:.1f}s for RPM/TPM budget", file=sys.stderr, flush=True)
+            await asyncio.sleep(wait_time)
+
+
 class ModelManager:
     """模型管理器 - 统一的模型加载和缓存管理"""
     
     _shared_model: Optional[Any] = None
     _model_name_cache: Optional[str] = None
+    # 模型加载锁：get_model_async 在线程池中加载，并发调用时避免重复加载同一模型
+    _load_lock = threading.Lock()
     
     def __init__(self, config: MCPToolsConfig):
         self.config = config
+        # 已找到的本地模型路径缓存（模型名 -> 快照路径），避免每次调用都重新扫描快照目录
+        self._model_path_cache: Dict[str, str] = {}
     
     def get_project_model_path(self, model_name: str = "paraphrase-multilingual-MiniLM-L12-v2") -> Optional[str]:
         """
@@ -379,6 +641,10 @@ class ModelManager:
         返回:
             str: 本地模型路径，如果不存在则返回None
         """
+        cached_path = self._model_path_cache.get(model_name)
+        if cached_path is not None:
+            return cached_path
+        
         # 构建模型目录路径
         model_dir = self.config.models_path / f"models--sentence-transformers--{model_name}"
         
@@ -402,7 +668,10 @@ class ModelManager:
         latest_snapshot = max(snapshot_dirs, key=lambda d: d.stat().st_mtime)
         print(f"找到本地模型: {latest_snapshot}", file=sys.stderr, flush=True)
         # 转换为字符串并标准化路径分隔符，确保跨平台兼容性
-        return str(latest_snapshot).replace('\\', '/')
+        # 只缓存找到的路径：未找到时模型可能随后被下载，下次调用需重新扫描
+        model_path = str(latest_snapshot).replace('\\', '/')
+        self._model_path_cache[model_name] = model_path
+        return model_path
     
     def get_model(self, model_name: str = "paraphrase-multilingual-MiniLM-L12-v2") -> Any:
         """
@@ -414,79 +683,96 @@ class ModelManager:
         返回:
             SentenceTransformer: 模型实例
         """
-        if (ModelManager._shared_model is None or 
-            ModelManager._model_name_cache != model_name):
-
-            # 降噪：抑制第三方库在加载模型时的 INFO 输出，并确保输出到 stderr
-            try:
-                import logging
-                for _name in ("sentence_transformers", "transformers"):
-                    _logger = logging.getLogger(_name)
-                    _logger.setLevel(logging.WARNING)
-                    # 绑定到 stderr，避免默认 handler 输出到 stdout 的风险
-                    if not _logger.handlers:
-                        _h = logging.StreamHandler(sys.stderr)
-                        _h.setLevel(logging.WARNING)
-                        _logger.addHandler(_h)
-                    # 避免向 root 传播，防止其他 handler 将其导向 stdout
-                    _logger.propagate = False
-            except Exception:
-                pass
+        if not self.is_model_loaded(model_name):
+            # 加锁后再次检查，等待中的调用直接复用先完成加载的模型
+            with ModelManager._load_lock:
+                if not self.is_model_loaded(model_name):
+                    self._load_model(model_name)
+        
+        return ModelManager._shared_model
+    
+    def _load_model(self, model_name: str):
+        """加载模型并写入共享缓存（调用方需持有 _load_lock）"""
+        # 降噪：抑制第三方库在加载模型时的 INFO 输出，并确保输出到 stderr
+        try:
+            import logging
+            for _name in ("sentence_transformers", "transformers"):
+                _logger = logging.getLogger(_name)
+                _logger.setLevel(logging.WARNING)
+                # 绑定到 stderr，避免默认 handler 输出到 stdout 的风险
+                if not _logger.handlers:
+                    _h = logging.StreamHandler(sys.stderr)
+                    _h.setLevel(logging.WARNING)
+                    _logger.addHandler(_h)
+                # 避免向 root 传播，防止其他 handler 将其导向 stdout
+                _logger.propagate = False
+        except Exception:
+            pass
 
-            print(f"正在加载向量化模型: {model_name}", file=sys.stderr, flush=True)
+        print(f"正在加载向量化模型: {model_name}", file=sys.stderr, flush=True)
 
-            # 降噪：进一步通过环境变量抑制 transformers/hf-hub 的详细日志与警告
-            os.environ.setdefault("TRANSFORMERS_VERBOSITY", "error")
-            os.environ.setdefault("HF_HUB_DISABLE_TELEMETRY", "1")
-            os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+        # 降噪：进一步通过环境变量抑制 transformers/hf-hub 的详细日志与警告
+        os.environ.setdefault("TRANSFORMERS_VERBOSITY", "error")
+        os.environ.setdefault("HF_HUB_DISABLE_TELEMETRY", "1")
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+        
+        # 尝试使用项目本地模型
+        local_model_path = self.get_project_model_path(model_name)
+        
+        if local_model_path:
+            print(f"使用本地模型: {local_model_path}", file=sys.stderr, flush=True)
+            # 延迟导入，避免在模块导入阶段引入重依赖
+            from sentence_transformers import SentenceTransformer
             
-            # 尝试使用项目本地模型
-            local_model_path = self.get_project_model_path(model_name)
+            # 使用 devnull 来静默加载，避免在 MCP Inspector 环境下的 stdout 重定向问题
+            import io
+            import contextlib
             
-            if local_model_path:
-                print(f"使用本地模型: {local_model_path}", file=sys.stderr, flush=True)
-                # 延迟导入，避免在模块导入阶段引入重依赖
-                from sentence_transformers import SentenceTransformer
-                
-                # 使用 devnull 来静默加载，避免在 MCP Inspector 环境下的 stdout 重定向问题
-                import io
-                import contextlib
-                
-                with contextlib.redirect_stdout(io.StringIO()):
-                    ModelManager._shared_model = SentenceTransformer(local_model_path)
-                    
-                print("本地模型加载完成", file=sys.stderr, flush=True)
-            else:
-                print(f"本地模型不存在，将下载到：{self.config.models_path / model_name}", file=sys.stderr, flush=True)
-                print("注意：首次运行需要VPN访问HuggingFace下载模型...", file=sys.stderr, flush=True)
-                
-                # 设置缓存目录到项目本地，标准化路径分隔符
-                cache_dir = str(self.config.models_path).replace('\\', '/')
-                # 仅设置 HF_HOME（TRANSFORMERS_CACHE 在 v5 将废弃，会触发 FutureWarning）
-                os.environ['HF_HOME'] = cache_dir
-                # 降噪：关闭 Windows 上的 symlink 能力告警（功能不受影响，仅提示空间占用可能增加）
-                os.environ.setdefault('HF_HUB_DISABLE_SYMLINKS_WARNING', '1')
-                
-                from sentence_transformers import SentenceTransformer
+            with contextlib.redirect_stdout(io.StringIO()):
+                model = SentenceTransformer(local_model_path)
                 
-                # 使用 devnull 来静默加载，避免在 MCP Inspector 环境下的 stdout 重定向问题
-                import io
-                import contextlib
-                
-                with contextlib.redirect_stdout(io.StringIO()):
-                    ModelManager._shared_model = SentenceTransformer(
-                        model_name,
-                        cache_folder=cache_dir
-                    )
-
-                # 说明：HuggingFace 将模型缓存到 HF_HOME 下的标准结构（models--* / snapshots / ...）
-                # 这里不直接指向具体快照目录，避免误导
-                print(f"模型已下载并缓存至：{cache_dir}", file=sys.stderr, flush=True)
+            print("本地模型加载完成", file=sys.stderr, flush=True)
+        else:
+            print(f"本地模型不存在，将下载到：{self.config.models_path / model_name}", file=sys.stderr, flush=True)
+            print("注意：首次运行需要VPN访问HuggingFace下载模型...", file=sys.stderr, flush=True)
+            
+            # 设置缓存目录到项目本地，标准化路径分隔符
+            cache_dir = str(self.config.models_path).replace('\\', '/')
+            # 仅设置 HF_HOME（TRANSFORMERS_CACHE 在 v5 将废弃，会触发 FutureWarning）
+            os.environ['HF_HOME'] = cache_dir
+            # 降噪：关闭 Windows 上的 symlink 能力告警（功能不受影响，仅提示空间占用可能增加）
+            os.environ.setdefault('HF_HUB_DISABLE_SYMLINKS_WARNING', '1')
+            
+            from sentence_transformers import SentenceTransformer
+            
+            # 使用 devnull 来静默加载，避免在 MCP Inspector 环境下的 stdout 重定向问题
+            import io
+            import contextlib
             
-            ModelManager._model_name_cache = model_name
-            print("模型加载完成", file=sys.stderr, flush=True)
+            with contextlib.redirect_stdout(io.StringIO()):
+                model = SentenceTransformer(
+                    model_name,
+                    cache_folder=cache_dir
+                )
+
+            # 说明：HuggingFace 将模型缓存到 HF_HOME 下的标准结构（models--* / snapshots / ...）
+            # 这里不直接指向具体快照目录，避免误导
+            print(f"模型已下载并缓存至：{cache_dir}", file=sys.stderr, flush=True)
         
-        return ModelManager._shared_model
+        # GPU上使用FP16推理，矩阵运算带宽减半；CPU上保持FP32（无BF16指令集时半精度反而更慢）
+        try:
+            import torch
+            if torch.cuda.is_available() and str(getattr(model, "device", "")).startswith("cuda"):
+                model = model.half()
+                print("模型已切换为FP16推理", file=sys.stderr, flush=True)
+        except Exception as e:
+            print(f"FP16切换失败，继续使用FP32: {e}", file=sys.stderr, flush=True)
+        
+        # 先清空名称再替换模型，避免无锁读取方拿到名称与模型不匹配的缓存
+        ModelManager._model_name_cache = None
+        ModelManager._shared_model = model
+        ModelManager._model_name_cache = model_name
+        print("模型加载完成", file=sys.stderr, flush=True)
     
     async def get_model_async(self, model_name: str = "paraphrase-multilingual-MiniLM-L12-v2") -> Any:
         """
@@ -637,26 +923,28 @@ class FileManager:
             List[Dict[str, Any]]: 行字典列表
         """
         try:
-            df = pd.read_excel(excel_file_path)
+            try:
+                df = pd.read_excel(excel_file_path, engine=_EXCEL_ENGINE)
+            except Exception:
+                if _EXCEL_ENGINE is None:
+                    raise
+                # calamine 无法解析时回退到默认引擎
+                df = pd.read_excel(excel_file_path)
         except Exception as e:
             raise RuntimeError(f"读取Excel失败: {excel_file_path} — {e}")
 
-        results: List[Dict[str, Any]] = []
-        # 使用DataFrame的get以容错缺少列的情况
-        for _, row in df.iterrows():
-            item: Dict[str, Any] = {}
-            for xls_col, out_key in column_mapping.items():
-                val = row.get(xls_col, "")
-                if na_to_empty and (pd.isna(val) or val is None):
-                    val = ""
-                # 统一为字符串并去除两端空白
-                if isinstance(val, str):
-                    item[out_key] = val.strip()
-                else:
-                    # 对数字等非字符串，保持原值；若需要字符串，调用方可自行转换
-                    item[out_key] = val
-            results.append(item)
-        return results
+        # 按映射一次性选取列（缺失列补空字符串）并重命名，避免逐行 iterrows 构造对象
+        df = df.reindex(columns=list(column_mapping.keys()), fill_value="")
+        df.columns = list(column_mapping.values())
+        if na_to_empty:
+            df = df.astype(object).where(df.notna(), "")
+
+        # 字符串去除两端空白；数字等非字符串保持原值，若需要字符串，调用方可自行转换
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = df[col].map(lambda v: v.strip() if isinstance(v, str) else v)
+
+        return df.to_dict(orient="records")
     
     def load_tapd_data(self, file_path: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -678,8 +966,7 @@ class FileManager:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"数据文件不存在: {file_path}")
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return _read_json_file(file_path)
     
     def load_json_data(self, file_path: str) -> Dict[str, Any]:
         """
@@ -695,8 +982,7 @@ class FileManager:
             return {}
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return _read_json_file(file_path)
         except (json.JSONDecodeError, IOError) as e:
             print(f"[FileManager] Failed to load JSON: {file_path} — {e}", file=sys.stderr, flush=True)
             return {}
@@ -709,10 +995,26 @@ class FileManager:
             data: 要保存的数据
             file_path: 保存路径
         """
-        # 确保目录存在
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        # 确保目录存在（仅文件名时写入当前目录）
+        dir_name = os.path.dirname(file_path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        
+        if orjson is not None:
+            try:
+                # 直接序列化为UTF-8字节，格式与标准库输出一致（2空格缩进、保留中文）
+                payload = orjson.dumps(
+                    data,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+                )
+            except TypeError:
+                payload = None  # 含 orjson 不支持的类型时回退到标准库
+            if payload is not None:
+                with open(file_path, 'wb', buffering=_JSON_IO_BUFFER_SIZE) as f:
+                    f.write(payload)
+                return
         
-        with open(file_path, 'w', encoding='utf-8') as f:
+        with open(file_path, 'w', encoding='utf-8', buffering=_JSON_IO_BUFFER_SIZE) as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
 
 
@@ -832,13 +1134,61 @@ class TransmissionManager:
         return report
 
 
+class _CharClassTable(dict):
+    """
+    字符类别映射表（供 str.translate 使用）
+
+    按码点首次出现时惰性分类并缓存，分类规则与原先的逐类正则统计一致：
+    c=中文，e=英文字母，d=数字，p=标点，s=空白，o=其他
+    """
+
+    def __missing__(self, code: int) -> str:
+        char = chr(code)
+        if 0x4e00 <= code <= 0x9fff:
+            cls = 'c'
+        elif 'a' <= char <= 'z' or 'A' <= char <= 'Z':
+            cls = 'e'
+        elif '0' <= char <= '9':
+            cls = 'd'
+        elif _PUNCTUATION_PATTERN.match(char):
+            cls = 'p'
+        elif _SPACE_PATTERN.match(char):
+            cls = 's'
+        else:
+            cls = 'o'
+        self[code] = cls
+        return cls
+
+
+_PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+_SPACE_PATTERN = re.compile(r'\s')
+_CHAR_CLASS_TABLE = _CharClassTable()
+
+# count_tokens 结果缓存的最大条目数（LRU淘汰），模板、需求单与批次JSON会被反复计数
+_TOKEN_CACHE_MAX_ENTRIES = 4096
+
+
 class TokenCounter:
     """Token计数器 - 支持transformers tokenizer和改进的预估模式"""
     
     def __init__(self, config: Optional[MCPToolsConfig] = None):
         self.config = config or get_config()
         self.tokenizer = None
-        self._try_load_tokenizer()
+        # 文本 -> token数量 的LRU缓存，锁保护并发批次下的读写
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # tokenizer 延迟到首次实际计数时加载（导入 transformers 耗时且占用内存较大）
+        self._tokenizer_load_attempted = False
+        self._tokenizer_lock = threading.Lock()
+
+    def _ensure_tokenizer(self):
+        """首次调用时尝试加载tokenizer，之后直接返回加载结果（未加载成功时为None）"""
+        if not self._tokenizer_load_attempted:
+            with self._tokenizer_lock:
+                if not self._tokenizer_load_attempted:
+                    self._try_load_tokenizer()
+                    self._tokenizer_load_attempted = True
+        return self.tokenizer
     
     def _try_load_tokenizer(self):
         """尝试加载DeepSeek tokenizer"""
@@ -852,6 +1202,7 @@ class TokenCounter:
                 self.tokenizer = transformers.AutoTokenizer.from_pretrained(
                     str(tokenizer_path),
                     trust_remote_code=True,
+                    use_fast=True,
                 )
                 print(
                     "[TokenCounter] Loaded DeepSeek tokenizer (transformers); using exact token counting",
@@ -888,25 +1239,90 @@ class TokenCounter:
         返回:
             token数量
         """
-        if self.tokenizer:
+        with self._cache_lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+                return cached
+
+        token_count = self._count_tokens_uncached(text)
+        self._store_cached(text, token_count)
+        return token_count
+
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """
+        批量计算多段文本的token数量，未命中缓存的文本一次性交给tokenizer编码
+
+        参数:
+            texts: 要计算的文本列表
+
+        返回:
+            与texts一一对应的token数量列表
+        """
+        results: List[int] = [0] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        with self._cache_lock:
+            for i, text in enumerate(texts):
+                cached = self._cache.get(text)
+                if cached is not None:
+                    self._cache.move_to_end(text)
+                    results[i] = cached
+                else:
+                    missing.setdefault(text, []).append(i)
+
+        if not missing:
+            return results
+
+        pending = list(missing)
+        counts: Optional[List[int]] = None
+        tokenizer = self._ensure_tokenizer()
+        if tokenizer:
             try:
-                tokens = self.tokenizer.encode(text)
+                # 与 encode 保持一致（含特殊token），仅返回长度
+                counts = list(tokenizer(pending, return_length=True)["length"])
+            except Exception as e:
+                print(f"[TokenCounter] Tokenizer batch count failed: {e}; falling back to estimation", file=sys.stderr, flush=True)
+        if counts is None:
+            counts = [self._estimate_tokens(text) for text in pending]
+
+        for text, token_count in zip(pending, counts):
+            self._store_cached(text, token_count)
+            for i in missing[text]:
+                results[i] = token_count
+        return results
+
+    def _store_cached(self, text: str, token_count: int) -> None:
+        """写入LRU缓存，超出上限时淘汰最久未使用的条目"""
+        with self._cache_lock:
+            self._cache[text] = token_count
+            if len(self._cache) > _TOKEN_CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
+
+    def _count_tokens_uncached(self, text: str) -> int:
+        """计算文本的token数量（不经过缓存）"""
+        tokenizer = self._ensure_tokenizer()
+        if tokenizer:
+            try:
+                tokens = tokenizer.encode(text)
                 return len(tokens)
             except Exception as e:
                 print(f"[TokenCounter] Tokenizer count failed: {e}; falling back to estimation", file=sys.stderr, flush=True)
-        
+        return self._estimate_tokens(text)
+
+    def _estimate_tokens(self, text: str) -> int:
+        """未加载tokenizer时的预估计数"""
         # 改进的预估模式：基于测试结果优化参数
         # 测试结果显示：
         # - 样本文本平均比率: 0.98 (预估vs实际)
         # - 真实用例平均比率: 0.91 (预估vs实际)
         # - 预估模式总体偏低约10%，需要调整系数
-        import re
-        
-        chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', text))
-        english_chars = len(re.findall(r'[a-zA-Z]', text))
-        digits = len(re.findall(r'[0-9]', text))
-        punctuation = len(re.findall(r'[^\w\s]', text))
-        spaces = len(re.findall(r'\s', text))
+        # 单次 translate 将每个字符映射为类别字母，再按类别计数，避免对全文做多次正则扫描
+        classified = text.translate(_CHAR_CLASS_TABLE)
+        chinese_chars = classified.count('c')
+        english_chars = classified.count('e')
+        digits = classified.count('d')
+        punctuation = classified.count('p')
+        spaces = classified.count('s')
         other_chars = len(text) - chinese_chars - english_chars - digits - punctuation - spaces
         
         # 基于测试结果调整的系数
@@ -965,6 +1381,43 @@ class BatchingUtils:    # 无状态、仅提供静态方法，不提供全局实
         next_index = start_index + len(batch)
         return batch, next_index, last_tokens
 
+    @staticmethod
+    def split_by_item_tokens(
+        item_tokens: List[int],
+        token_threshold: int,
+        start_index: int = 0,
+        base_tokens: int = 0,
+        separator_tokens: int = 0
+    ) -> Tuple[int, int]:
+        """
+        基于预先计算好的单项token数，从start_index开始累加装入一批（不重新序列化/计数整批）；
+        若首个元素本身即超过阈值，也会收纳该元素以保证前进。
+
+        参数:
+            item_tokens: 每个元素的token数
+            token_threshold: 批次token阈值
+            start_index: 开始索引
+            base_tokens: 批次的固定开销（如JSON列表括号）
+            separator_tokens: 相邻元素之间的分隔开销
+
+        返回: (下一批起始索引, 当前批次累计token数)
+        """
+        if start_index >= len(item_tokens):
+            return start_index, 0
+
+        running = base_tokens
+        next_index = start_index
+        for i in range(start_index, len(item_tokens)):
+            tentative = running + item_tokens[i]
+            if i > start_index:
+                tentative += separator_tokens
+            if tentative > token_threshold and i > start_index:
+                break
+            running = tentative
+            next_index = i + 1
+
+        return next_index, running
+
 class TokenBudgetUtils:  # 无状态：统一的回复token预算计算工具
     """
     统一的回复 token 预算计算：确保在总上下文窗口内满足 请求(prompt)+回复(response)+安全余量(safety)。
@@ -1019,6 +1472,10 @@ class TokenBudgetUtils:  # 无状态：统一的回复token预算计算工具
 
 
 
+# Markdown表格对齐分隔行中的单元格（去除空格后），如 ---、:---:、---:
+_MD_SEP_CELL_PATTERN = re.compile(r":?-{3,}:?")
+
+
 class MarkdownUtils:    # 无状态、仅提供静态方法，不提供全局实例函数
     """Markdown表格解析通用工具（纯解析，不做业务映射）。"""
 
@@ -1034,8 +1491,6 @@ class MarkdownUtils:    # 无状态、仅提供静态方法，不提供全局实
         """
         lines = md_text.splitlines()
         tables: List[Dict[str, Any]] = []
-
-        i = 0
         n = len(lines)
 
         def split_row(line: str) -> List[str]:
@@ -1049,19 +1504,26 @@ class MarkdownUtils:    # 无状态、仅提供静态方法，不提供全局实
 
         def is_sep_row(line: str) -> bool:
             # 典型分隔行：| --- | :---: | ---: |
+            if '|' not in line or '-' not in line:
+                return False
             core = line.strip().strip('|').strip()
             if not core:
                 return False
-            cells = [c.strip() for c in core.split('|')]
-            if not cells:
-                return False
-            return all(re.fullmatch(r":?-{3,}:?", c.replace(' ', '')) is not None for c in cells)
+            return all(
+                _MD_SEP_CELL_PATTERN.fullmatch(c.strip().replace(' ', '')) is not None
+                for c in core.split('|')
+            )
+
+        # 每行只判定一次是否为对齐分隔行，后续按下标查表
+        sep_flags = [is_sep_row(line) for line in lines]
+        sep_flags.append(False)
 
+        i = 0
         while i < n:
             line = lines[i].rstrip()
 
             # 找到表头候选行：包含至少一个'|'并且下一行是对齐分隔行
-            if '|' in line and (i + 1) < n and '|' in lines[i + 1] and is_sep_row(lines[i + 1]):
+            if '|' in line and sep_flags[i + 1]:
                 headers = split_row(line)
                 i += 2  # 跳过分隔行
                 rows: List[List[str]] = []
@@ -1070,7 +1532,7 @@ class MarkdownUtils:    # 无状态、仅提供静态方法，不提供全局实
                     data_line = lines[i].rstrip()
                     if '|' in data_line:
                         # 到下一个表或无效结构时停止
-                        if (i + 1) < n and '|' in lines[i + 1] and is_sep_row(lines[i + 1]):
+                        if sep_flags[i + 1]:
                             break
                         rows.append(split_row(data_line))
                         i += 1
@@ -1092,6 +1554,8 @@ _global_file_manager: Optional[FileManager] = None
 _global_api_manager: Optional[APIManager] = None
 _global_transmission_manager: Optional[TransmissionManager] = None
 _global_token_counter: Optional[TokenCounter] = None
+_global_response_cache: Optional[ResponseCache] = None
+_global_rate_limiter: Optional[TokenBucket] = None
 
 def get_config() -> MCPToolsConfig:
     """获取全局配置实例"""
@@ -1141,6 +1605,25 @@ def get_token_counter() -> TokenCounter:
     return _global_token_counter
 
 
+def get_response_cache() -> ResponseCache:
+    """获取全局LLM响应缓存实例"""
+    global _global_response_cache
+    if _global_response_cache is None:
+        _global_response_cache = ResponseCache(get_config())
+    return _global_response_cache
+
+
+def get_rate_limiter() -> TokenBucket:
+    """获取全局LLM请求限流器实例（额度由环境变量 LLM_RPM_LIMIT / LLM_TPM_LIMIT 设置，未设置时不限流）"""
+    global _global_rate_limiter
+    if _global_rate_limiter is None:
+        _global_rate_limiter = TokenBucket(
+            rpm=_env_positive_int("LLM_RPM_LIMIT"),
+            tpm=_env_positive_int("LLM_TPM_LIMIT"),
+        )
+    return _global_rate_limiter
+
+
 # 进程级（FD级）stdout→stderr 重定向，阻断C层/多线程对stdout的写入污染
 @contextmanager
 def redirect_stdout_fd_to_stderr():
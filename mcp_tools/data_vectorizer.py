@@ -18,7 +18,9 @@ import sys
 import asyncio
 import time
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 import faiss
 from contextlib import redirect_stdout
@@ -41,6 +43,33 @@ except ImportError:
         TextProcessor,
     )
 
+# 向量数量达到该阈值后改用HNSW图索引（近似检索，查询复杂度约为O(log N)），
+# 并以8bit标量量化存储向量（内存约为float32的1/4）；数据量较小时暴力内积检索更快且结果精确
+_HNSW_MIN_VECTORS = 1000
+_HNSW_M = 32
+_HNSW_EF_CONSTRUCTION = 80
+_HNSW_EF_SEARCH_MIN = 32
+# POSIX上以内存映射方式读取索引（按需分页，冷启动更快、常驻内存更小）；
+# Windows上被映射的文件无法删除或替换，会导致重新向量化失败，因此仍整体读入内存
+_INDEX_READ_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", 0) if os.name != "nt" else 0
+# 量化索引的训练样本数上限：训练前暂存的向量不超过该数量，之后逐批写入索引
+_INDEX_TRAIN_SAMPLE_SIZE = 4096
+
+
+@lru_cache(maxsize=256)
+def _encode_query_cached(model_name: str, query: str) -> np.ndarray:
+    """编码查询文本并缓存结果，重复查询（重试、刷新等）无需再次执行模型前向计算
+
+    返回归一化后的 (1, D) float32 只读向量；缓存键包含模型名，切换模型后不会命中旧向量。
+    """
+    model = get_model_manager().get_model(model_name)
+    vector = np.ascontiguousarray(
+        model.encode([query], convert_to_numpy=True, normalize_embeddings=True),
+        dtype=np.float32
+    )
+    vector.flags.writeable = False
+    return vector
+
 
 class TAPDDataVectorizer:
     """TAPD数据向量化处理器 - 优化版"""
@@ -63,19 +92,27 @@ class TAPDDataVectorizer:
         self.index: Optional[faiss.Index] = None
         self.metadata: List[Dict[str, Any]] = []
         self._last_error: Optional[str] = None
+        # 向量化时使用的源数据文件；元数据只保存条目ID，检索命中后从该文件取回原始条目
+        self.data_file_path: Optional[str] = None
+        # 向量化时源数据文件的 (修改时间, 大小)，用于检索时发现源文件已被改写、与向量不再对应
+        self.data_file_signature: Optional[Tuple[float, int]] = None
+        self._item_index: Optional[Dict[Any, Dict[str, Any]]] = None
+        self._item_index_key: Optional[Tuple[str, float, int]] = None
 
     # Lightweight logging (timestamped; flush immediately to Inspector notifications)
     def _log(self, msg: str) -> None:
         print(f"[Vectorizer {datetime.now().strftime('%H:%M:%S')}] {msg}", file=sys.stderr, flush=True)
 
     # --- FAISS 兼容性封装：适配不同Python封装签名 ---
-    def _faiss_add(self, x: np.ndarray) -> None:
-        """兼容不同 add 接口：优先使用 add(x)，失败时回退 add(n, x)"""
+    def _faiss_add(self, x: np.ndarray, index: Optional[faiss.Index] = None) -> None:
+        """兼容不同 add 接口：优先使用 add(x)，失败时回退 add(n, x)；未指定 index 时写入当前索引"""
+        if index is None:
+            index = self.index
         try:
-            self.index.add(x)  # type: ignore[arg-type]
+            index.add(x)  # type: ignore[arg-type]
         except TypeError:
             n = int(x.shape[0])
-            self.index.add(n, x)  # type: ignore[misc]
+            index.add(n, x)  # type: ignore[misc]
 
     def _faiss_search(self, x: np.ndarray, k: int):
         """兼容不同 search 接口：优先使用 search(x, k)，失败时回退 search(n, x, k, distances, labels)"""
@@ -88,6 +125,15 @@ class TAPDDataVectorizer:
             self.index.search(n, x, k, distances, labels)  # type: ignore[misc]
             return distances, labels
         
+    def _create_index(self, dimension: int, vector_count: int) -> faiss.Index:
+        """根据数据量选择索引类型：小数据量使用精确的IndexFlatIP，大数据量使用8bit量化的HNSW"""
+        if vector_count < _HNSW_MIN_VECTORS:
+            return faiss.IndexFlatIP(dimension)
+        index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_8bit, _HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = _HNSW_EF_CONSTRUCTION
+        self._log(f"Using HNSW index with 8-bit scalar quantization for {vector_count} vectors")
+        return index
+
     def _get_model(self):
         """获取模型实例"""
         return self.model_manager.get_model(self.model_name)
@@ -96,23 +142,48 @@ class TAPDDataVectorizer:
         """异步获取模型实例"""
         return await self.model_manager.get_model_async(self.model_name)
 
-    def _encode_texts_with_progress(self, model, texts: List[str], batch_size: int = 64) -> np.ndarray:
-        """分批进行编码，输出进度日志，避免长时间无输出。"""
+    def _encode_texts_into_index(self, model, texts: List[str], batch_size: int = 64) -> faiss.Index:
+        """分批进行编码并逐批写入新建的FAISS索引，输出进度日志，避免长时间无输出。
+
+        编码时直接由模型完成L2归一化（内积即余弦相似度）；每批向量编码后立即写入索引，
+        不再先拼出完整的N×D矩阵，峰值内存只与批大小（及量化索引的训练样本数）相关。
+        新索引在局部变量中构建，编码期间 self.index 保持为旧索引，并发检索不受影响；
+        由调用方在构建完成后与元数据一起替换。
+
+        返回:
+            faiss.Index: 构建完成的索引
+        """
         n = len(texts)
-        if n == 0:
-            return np.zeros((0, 384), dtype=np.float32)  # 维度将被实际模型覆盖，这里仅占位
-        vecs: List[np.ndarray] = []
+        pending: List[np.ndarray] = []  # 量化索引训练前暂存的向量
+        pending_count = 0
+        train_size = min(n, _INDEX_TRAIN_SAMPLE_SIZE)
+        index: Optional[faiss.Index] = None
         start = time.perf_counter()
         for i in range(0, n, batch_size):
             batch = texts[i:i+batch_size]
             t0 = time.perf_counter()
-            v = model.encode(batch, show_progress_bar=False)
+            v = np.ascontiguousarray(
+                model.encode(batch, show_progress_bar=False, convert_to_numpy=True, normalize_embeddings=True),
+                dtype=np.float32
+            )
             dt = time.perf_counter() - t0
             self._log(f"Encoding progress {min(i+len(batch), n)}/{n}, batch elapsed {dt:.2f}s")
-            vecs.append(v)
+            if index is None:
+                index = self._create_index(int(v.shape[1]), n)
+            if not index.is_trained:
+                # 量化索引需先训练（统计各维度取值范围），样本攒够后训练并写入暂存向量
+                pending.append(v)
+                pending_count += len(v)
+                if pending_count < train_size:
+                    continue
+                v = np.vstack(pending)
+                pending = []
+                index.train(v)
+            # 兼容不同签名
+            self._faiss_add(v, index)
         total_dt = time.perf_counter() - start
-        self._log(f"Encoding completed, total {total_dt:.2f}s")
-        return np.vstack(vecs)
+        self._log(f"Encoding and indexing completed, total {total_dt:.2f}s")
+        return index
     
     def _chunk_data(self, items: List[Dict[str, Any]], item_type: str, chunk_size: int) -> List[Dict[str, Any]]:
         """
@@ -127,6 +198,7 @@ class TAPDDataVectorizer:
             List[Dict]: 分片后的数据，每个分片包含文本和元数据
         """
         chunks = []
+        missing_id_count = 0
         
         for i in range(0, len(items), chunk_size):
             chunk_items = items[i:i+chunk_size]
@@ -139,9 +211,12 @@ class TAPDDataVectorizer:
                 text = self.text_processor.extract_text_from_item(item, item_type)
                 chunk_texts.append(text)
                 
-                # 获取ID（兼容不同的ID字段）
-                item_id = item.get('id') or item.get('story_id') or item.get('bug_id') or str(i)
-                item_ids.append(item_id)
+                # 获取ID（兼容不同的ID字段）；无ID的条目仍参与向量化，但无法在检索时取回原始条目
+                item_id = item.get('id') or item.get('story_id') or item.get('bug_id')
+                if item_id:
+                    item_ids.append(item_id)
+                else:
+                    missing_id_count += 1
             
             # 合并文本
             chunk_text = " | ".join(chunk_texts)
@@ -155,15 +230,16 @@ class TAPDDataVectorizer:
                 'item_type': item_type,
                 'item_ids': item_ids,
                 'item_count': len(chunk_items),
-                'chunk_index': i//chunk_size,
-                'original_items': chunk_items  # 保存原始数据
+                'chunk_index': i//chunk_size
             }
             
             chunks.append({
                 'text': chunk_text,
                 'metadata': chunk_metadata
             })
-            
+        
+        if missing_id_count:
+            self._log(f"Warning: {missing_id_count} {item_type} items have no id; they are indexed but cannot be returned as search items")
         return chunks
     
     def process_tapd_data(self, data_file_path: Optional[str] = None, chunk_size: int = 10, remove_existing: bool = True) -> bool:
@@ -190,6 +266,7 @@ class TAPDDataVectorizer:
                 # Raise with a clear hint for MCP error propagation
                 raise FileNotFoundError(f"Data file not found: {effective_path}")
             self._log(f"Start vectorization, data file: {effective_path}")
+            data_file_signature = self._file_signature(effective_path)
             if chunk_size <= 0:
                 self._log(f"Warning: invalid chunk_size {chunk_size}, fallback to 10")
                 chunk_size = 10
@@ -231,24 +308,16 @@ class TAPDDataVectorizer:
             # 直接获取模型，依赖日志降噪配置避免第三方库写入 stdout
             model = self._get_model()
             self._log(f"Model ready in {(time.perf_counter()-t0):.2f}s")
-            # 分批编码，输出进度
-            vectors = self._encode_texts_with_progress(model, texts, batch_size=max(16, min(128, len(texts))))
-            
-            # 创建FAISS索引
+            # 分批编码并写入FAISS索引，输出进度
             self._log("Building vector index...")
-            dimension = int(vectors.shape[1])
-            self.index = faiss.IndexFlatIP(dimension)
+            index = self._encode_texts_into_index(model, texts, batch_size=max(16, min(128, len(texts))))
+            dimension = int(index.d)
             
-            # 标准化向量以便使用余弦相似度
-            t0 = time.perf_counter()
-            vectors_float32 = vectors.astype(np.float32)
-            faiss.normalize_L2(vectors_float32)
-            # 兼容不同签名
-            self._faiss_add(vectors_float32)
-            self._log(f"Index built in {(time.perf_counter()-t0):.2f}s")
-            
-            # 保存元数据
+            # 索引构建完成后再与元数据、源数据文件一起替换，避免并发检索看到不一致的状态
+            self.index = index
             self.metadata = [chunk['metadata'] for chunk in all_chunks]
+            self.data_file_path = effective_path
+            self.data_file_signature = data_file_signature
             
             # 保存到文件
             t0 = time.perf_counter()
@@ -268,7 +337,7 @@ class TAPDDataVectorizer:
         """保存向量数据库到文件
         
         参数:
-            remove_existing: 保存前是否删除已有文件（.config.json/.index/.metadata.pkl），默认删除
+            remove_existing: 保存前是否删除已有文件（.config.json/.index/.metadata.json，以及旧版的.metadata.pkl），默认删除
         """
         try:
             # 确保目录存在
@@ -278,10 +347,11 @@ class TAPDDataVectorizer:
             index_path = f"{self.vector_db_path}.index"
             
             # 如需清理旧文件，先删除再写入，避免旧文件残留
-            metadata_path = f"{self.vector_db_path}.metadata.pkl"
+            metadata_path = f"{self.vector_db_path}.metadata.json"
+            legacy_metadata_path = f"{self.vector_db_path}.metadata.pkl"
             config_path = f"{self.vector_db_path}.config.json"
             if remove_existing:
-                for p in (index_path, metadata_path, config_path):
+                for p in (index_path, metadata_path, legacy_metadata_path, config_path):
                     try:
                         if os.path.exists(p):
                             os.remove(p)
@@ -289,17 +359,22 @@ class TAPDDataVectorizer:
                     except Exception as rm_err:
                         self._log(f"Warning: failed to remove {p}: {rm_err}")
 
-            faiss.write_index(self.index, index_path)
+            # 先写临时文件再原子替换，避免截断正被其他进程内存映射读取的索引文件
+            tmp_index_path = f"{index_path}.tmp"
+            faiss.write_index(self.index, tmp_index_path)
+            os.replace(tmp_index_path, index_path)
             
-            # 保存元数据 (向量数据和元数据仍需要特殊处理，因为FileManager没有支持pickle和faiss格式)
-            with open(metadata_path, 'wb') as f:
-                pickle.dump(self.metadata, f)
+            # 保存元数据 - 使用统一的FileManager（JSON格式，安装 orjson 时自动加速）
+            self.file_manager.save_json_data(self.metadata, metadata_path)
                 
             # 保存配置信息 - 使用统一的FileManager
             config = {
                 'model_name': self.model_name,
                 'chunk_count': len(self.metadata),
                 'vector_dimension': self.index.d if self.index else 0,
+                'data_file_path': self._project_relative_path(self.data_file_path),
+                'data_file_mtime': self.data_file_signature[0] if self.data_file_signature else None,
+                'data_file_size': self.data_file_signature[1] if self.data_file_signature else None,
                 'created_at': str(np.datetime64('now'))
             }
             self.file_manager.save_json_data(config, config_path)
@@ -318,22 +393,34 @@ class TAPDDataVectorizer:
                 self._log(f"Vector index file not found: {index_path}")
                 return False
                 
-            self.index = faiss.read_index(index_path)
-            
-            # 加载元数据
-            metadata_path = f"{self.vector_db_path}.metadata.pkl"
-            if not os.path.exists(metadata_path):
+            self.index = faiss.read_index(index_path, _INDEX_READ_FLAGS)
+            
+            # 加载元数据：优先读取JSON格式，兼容旧版pickle格式
+            metadata_path = f"{self.vector_db_path}.metadata.json"
+            legacy_metadata_path = f"{self.vector_db_path}.metadata.pkl"
+            if os.path.exists(metadata_path):
+                metadata = self.file_manager.load_json_data(metadata_path)
+                if not isinstance(metadata, list):
+                    self._log(f"Invalid metadata file: {metadata_path}")
+                    return False
+                self.metadata = metadata
+            elif os.path.exists(legacy_metadata_path):
+                with open(legacy_metadata_path, 'rb') as f:
+                    self.metadata = pickle.load(f)
+            else:
                 self._log(f"Metadata file not found: {metadata_path}")
                 return False
-                
-            with open(metadata_path, 'rb') as f:
-                self.metadata = pickle.load(f)
             
             # 加载配置 - 使用统一的FileManager
             config_path = f"{self.vector_db_path}.config.json"
             if os.path.exists(config_path):
                 try:
                     config = self.file_manager.load_json_data(config_path)
+                    self.data_file_path = self._resolve_project_path(config.get('data_file_path'))
+                    if config.get('data_file_mtime') is not None and config.get('data_file_size') is not None:
+                        self.data_file_signature = (float(config['data_file_mtime']), int(config['data_file_size']))
+                    else:
+                        self.data_file_signature = None  # 旧版配置未记录源文件状态，无法校验
                     self._log(f"Vector DB loaded - model: {config.get('model_name')}, chunks: {config.get('chunk_count')}, dim: {config.get('vector_dimension')}")
                     saved_model = str(config.get('model_name') or '').strip()
                     self._log(f"Vector DB loaded - model: {saved_model}, chunks: {config.get('chunk_count')}, dim: {config.get('vector_dimension')}")
@@ -355,13 +442,14 @@ class TAPDDataVectorizer:
             self._log(f"Error loading vector DB: {str(e)}")
             return False
     
-    def search_similar(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    def search_similar(self, query: str, top_k: int = 5, include_items: bool = True) -> List[Dict[str, Any]]:
         """
         搜索与查询最相似的数据片段
         
         参数:
             query: 查询文本
             top_k: 返回最相似的K个结果
+            include_items: 是否取回分片的原始条目，为False时只返回分数和元数据（含条目ID）
             
         返回:
             List[Dict]: 相似结果列表，包含分数和元数据
@@ -371,27 +459,30 @@ class TAPDDataVectorizer:
                 if not self.load_vector_db():
                     return []
             
-            # 向量化查询（保持与Faiss接口的数据类型一致）
-            model = self._get_model()
-            query_vector = model.encode([query]).astype(np.float32)
-            faiss.normalize_L2(query_vector)
+            # 向量化查询（编码时归一化，保持与Faiss接口的数据类型一致；相同查询复用缓存向量）
+            query_vector = _encode_query_cached(self.model_name, query.strip())
             
             # 搜索
             if self.index is not None:
-                query_float32 = query_vector.astype(np.float32)
+                # HNSW索引按返回数量调整搜索宽度，保证召回率
+                hnsw = getattr(self.index, 'hnsw', None)
+                if hnsw is not None:
+                    hnsw.efSearch = max(_HNSW_EF_SEARCH_MIN, top_k * 4)
                 # 兼容不同签名
-                scores, indices = self._faiss_search(query_float32, top_k)
+                scores, indices = self._faiss_search(query_vector, top_k)
             else:
                 raise ValueError("索引未正确加载")
             
             results = []
             for score, idx in zip(scores[0], indices[0]):
-                if idx < len(self.metadata):
+                # FAISS 结果不足 top_k 时以 -1 填充
+                if 0 <= idx < len(self.metadata):
                     result = {
                         'score': float(score),
-                        'metadata': self.metadata[idx],
-                        'items': self.metadata[idx].get('original_items', [])
+                        'metadata': self.metadata[idx]
                     }
+                    if include_items:
+                        result['items'] = self._resolve_items(self.metadata[idx])
                     results.append(result)
             
             return results
@@ -400,6 +491,75 @@ class TAPDDataVectorizer:
             self._log(f"Error during search: {str(e)}")
             return []
     
+    def _project_relative_path(self, path: Optional[str]) -> Optional[str]:
+        """位于项目目录内的路径转为相对项目根目录的路径（POSIX分隔符），项目整体移动后仍可解析"""
+        if not path:
+            return path
+        project_root = Path(self.config._get_project_root()).resolve()
+        try:
+            return Path(path).resolve().relative_to(project_root).as_posix()
+        except ValueError:
+            return str(path)
+
+    def _resolve_project_path(self, path: Optional[str]) -> Optional[str]:
+        """相对路径按项目根目录解析（兼容旧版配置中的绝对路径）"""
+        if not path or os.path.isabs(path):
+            return path
+        return os.path.join(self.config._get_project_root(), path)
+
+    @staticmethod
+    def _file_signature(path: str) -> Optional[Tuple[float, int]]:
+        """返回文件的 (修改时间, 大小)，文件不存在时返回 None"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime, st.st_size)
+
+    def source_data_warning(self) -> Optional[str]:
+        """检查源数据文件是否仍与向量化时一致；不一致时返回警告信息（检索取回的条目可能与向量不对应）"""
+        if not self.data_file_path:
+            return None
+        current = self._file_signature(self.data_file_path)
+        if current is None:
+            return f"Source data file not found: {self.data_file_path}; search items cannot be resolved"
+        if self.data_file_signature is not None and current != self.data_file_signature:
+            return (f"Source data file changed since vectorization: {self.data_file_path}; "
+                    f"search items may not match the vectors, re-run vectorization")
+        return None
+
+    def _load_item_index(self) -> Dict[Any, Dict[str, Any]]:
+        """按 (条目类型, 条目ID) 索引源数据文件中的条目，源文件修改后自动重建"""
+        path = self.data_file_path
+        signature = self._file_signature(path) if path else None
+        if signature is None:
+            return {}
+        cache_key = (path, signature[0], signature[1])
+        if self._item_index is None or self._item_index_key != cache_key:
+            data = self.file_manager.load_json_data(path)
+            item_index: Dict[Any, Dict[str, Any]] = {}
+            for item_type, key in (("story", "stories"), ("bug", "bugs")):
+                for item in data.get(key, []):
+                    item_id = item.get('id') or item.get('story_id') or item.get('bug_id')
+                    if item_id:
+                        item_index[(item_type, item_id)] = item
+            self._item_index = item_index
+            self._item_index_key = cache_key
+        return self._item_index
+
+    def _resolve_items(self, metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """根据分片元数据中的条目ID取回原始条目（兼容旧版元数据中内嵌的 original_items）"""
+        if 'original_items' in metadata:
+            return metadata['original_items']
+        item_index = self._load_item_index()
+        item_type = metadata.get('item_type')
+        item_ids = metadata.get('item_ids', [])
+        items = [item for item in (item_index.get((item_type, item_id)) for item_id in item_ids) if item is not None]
+        if len(items) < len(item_ids):
+            self._log(f"Warning: {len(item_ids) - len(items)} of {len(item_ids)} items in chunk "
+                      f"{metadata.get('chunk_id')} not found in source data file {self.data_file_path}")
+        return items
+
     def get_database_stats(self) -> Dict[str, Any]:
         """获取数据库统计信息"""
         try:
@@ -407,13 +567,26 @@ class TAPDDataVectorizer:
                 if not self.load_vector_db():
                     return {}
             
+            # 单次遍历元数据，同时统计条目总数和各类型分片数
+            total_items = story_chunks = bug_chunks = 0
+            for meta in self.metadata:
+                total_items += meta.get('item_count', 0)
+                item_type = meta.get('item_type')
+                if item_type == 'story':
+                    story_chunks += 1
+                elif item_type == 'bug':
+                    bug_chunks += 1
+            
             stats = {
                 'total_chunks': len(self.metadata),
                 'vector_dimension': self.index.d if self.index is not None else 0,
-                'total_items': sum(meta.get('item_count', 0) for meta in self.metadata),
-                'story_chunks': sum(1 for meta in self.metadata if meta.get('item_type') == 'story'),
-                'bug_chunks': sum(1 for meta in self.metadata if meta.get('item_type') == 'bug'),
+                'total_items': total_items,
+                'story_chunks': story_chunks,
+                'bug_chunks': bug_chunks,
             }
+            source_warning = self.source_data_warning()
+            if source_warning:
+                stats['source_data_warning'] = source_warning
             
             return stats
             
@@ -445,12 +618,14 @@ class TAPDDataVectorizer:
                 # Raise with a clear hint for MCP error propagation
                 raise FileNotFoundError(f"Data file not found: {effective_path}")
             self._log(f"Start async vectorization, data file: {effective_path}")
+            data_file_signature = self._file_signature(effective_path)
             if chunk_size <= 0:
                 self._log(f"Warning: invalid chunk_size {chunk_size}, fallback to 10")
                 chunk_size = 10
             # Read JSON by absolute path; avoid any special local_data-relative logic
+            # 大文件读取与解析在线程池中执行，避免阻塞事件循环
             t0 = time.perf_counter()
-            data = self.file_manager.load_json_data(effective_path)
+            data = await asyncio.to_thread(self.file_manager.load_json_data, effective_path)
             self._log(f"Data file loaded in {(time.perf_counter()-t0):.2f}s")
             
             # 提取需求和缺陷数据
@@ -486,29 +661,21 @@ class TAPDDataVectorizer:
             # 异步获取模型，避免阻塞事件循环
             model = await self._get_model_async()
             self._log(f"Model ready in {(time.perf_counter()-t0):.2f}s")
-            # 分批编码，输出进度 - 需要在线程池中执行，因为编码是CPU密集型任务
-            vectors = await asyncio.to_thread(
-                self._encode_texts_with_progress, 
+            # 分批编码并写入FAISS索引，输出进度 - 需要在线程池中执行，因为编码和建索引是CPU密集型任务
+            self._log("Building vector index...")
+            index = await asyncio.to_thread(
+                self._encode_texts_into_index, 
                 model, 
                 texts, 
                 max(16, min(128, len(texts)))
             )
+            dimension = int(index.d)
             
-            # 创建FAISS索引 - 也需要在线程池中执行
-            self._log("Building vector index...")
-            dimension = int(vectors.shape[1])
-            self.index = faiss.IndexFlatIP(dimension)
-            
-            # 标准化向量以便使用余弦相似度
-            t0 = time.perf_counter()
-            vectors_float32 = vectors.astype(np.float32)
-            faiss.normalize_L2(vectors_float32)
-            # 兼容不同签名
-            self._faiss_add(vectors_float32)
-            self._log(f"Index built in {(time.perf_counter()-t0):.2f}s")
-            
-            # 保存元数据
+            # 索引构建完成后再与元数据、源数据文件一起替换，避免并发检索看到不一致的状态
+            self.index = index
             self.metadata = [chunk['metadata'] for chunk in all_chunks]
+            self.data_file_path = effective_path
+            self.data_file_signature = data_file_signature
             
             # 保存到文件 - 在线程池中执行I/O操作
             t0 = time.perf_counter()
@@ -552,7 +719,7 @@ async def vectorize_tapd_data(data_file_path: Optional[str] = None, chunk_size:
             success = await asyncio.to_thread(vectorizer.process_tapd_data, data_file_path, chunk_size, remove_existing)
         
         if success:
-            stats = vectorizer.get_database_stats()
+            stats = await asyncio.to_thread(vectorizer.get_database_stats)
             return {
                 "status": "success",
                 "message": "Vectorization completed",
@@ -587,13 +754,14 @@ async def vectorize_tapd_data(data_file_path: Optional[str] = None, chunk_size:
         }
 
 
-async def search_tapd_data(query: str, top_k: int = 5) -> dict:
+async def search_tapd_data(query: str, top_k: int = 5, include_items: bool = True) -> dict:
     """
     Search related content in vectorized TAPD data
     
     参数:
         query: 搜索查询
         top_k: 返回最相似的K个结果
+        include_items: 是否在结果中附带原始条目；为False时只返回分片信息（含条目ID），响应体更小
         
     返回:
     Result dict
@@ -613,17 +781,14 @@ async def search_tapd_data(query: str, top_k: int = 5) -> dict:
 
         # 固定返回相似度最高的前两批（即前2个分片/组）
         group_count = 2
-        top_chunks = vectorizer.search_similar(query, group_count)
+        # 首次搜索需加载索引与模型，查询编码也是CPU密集型任务，均在线程池中执行，避免阻塞事件循环
+        top_chunks = await asyncio.to_thread(vectorizer.search_similar, query, group_count, include_items)
 
         if top_chunks:
             formatted_results = []
             for rank, chunk in enumerate(top_chunks, start=1):
                 metadata = chunk['metadata']
-                # 从该分片的原始条目中取前 items_per_batch 条
-                # 目前按原顺序截取，如需更精准可在未来加入条目级向量或关键词打分
-                items = (chunk.get('items') or [])[:items_per_batch]
-
-                formatted_results.append({
+                batch = {
                     'batch_rank': rank,
                     'relevance_score': float(chunk['score']),
                     'chunk_info': {
@@ -631,11 +796,16 @@ async def search_tapd_data(query: str, top_k: int = 5) -> dict:
                         'item_type': metadata.get('item_type'),
                         'item_count': metadata.get('item_count'),
                         'item_ids': metadata.get('item_ids', [])
-                    },
-                    'items': items
-                })
+                    }
+                }
+                if include_items:
+                    # 从该分片的原始条目中取前 items_per_batch 条
+                    # 目前按原顺序截取，如需更精准可在未来加入条目级向量或关键词打分
+                    batch['items'] = (chunk.get('items') or [])[:items_per_batch]
 
-            return {
+                formatted_results.append(batch)
+
+            response = {
                 "status": "success",
                 "message": f"Returned top {len(formatted_results)} batches, {items_per_batch} items per batch",
                 "query": query,
@@ -643,6 +813,11 @@ async def search_tapd_data(query: str, top_k: int = 5) -> dict:
                 "items_per_batch": items_per_batch,
                 "results": formatted_results
             }
+            # 源数据文件在向量化后被改写或删除时提示调用方，取回的条目可能与向量不对应
+            source_warning = vectorizer.source_data_warning() if include_items else None
+            if source_warning:
+                response["warning"] = source_warning
+            return response
         else:
             return {
                 "status": "error",
@@ -673,7 +848,8 @@ async def get_vector_db_info() -> dict:
                 "message": "Vector DB not found; run vectorization first"
             }
         
-        stats = vectorizer.get_database_stats()
+        # 统计前可能需要从磁盘加载向量库，在线程池中执行
+        stats = await asyncio.to_thread(vectorizer.get_database_stats)
         
         if stats:
             return {
@@ -727,6 +903,7 @@ if __name__ == "__main__":
     p_search = subparsers.add_parser("search", help="在向量库中进行语义搜索")
     p_search.add_argument("--query", "-q", required=True, help="自然语言查询")
     p_search.add_argument("--topk", "-k", type=int, default=5, help="返回TopK，默认5")
+    p_search.add_argument("--ids-only", action="store_true", help="只返回分片信息与条目ID，不附带原始条目")
 
     args = parser.parse_args()
 
@@ -736,7 +913,7 @@ if __name__ == "__main__":
             res = await vectorize_tapd_data(data_file_path=args.data_file_path, chunk_size=args.chunk_size, remove_existing=(not getattr(args, "preserve_existing", False)))
             print(json.dumps(res, ensure_ascii=False, indent=2))
         elif args.command == "search":
-            res = await search_tapd_data(query=args.query, top_k=args.topk)
+            res = await search_tapd_data(query=args.query, top_k=args.topk, include_items=(not args.ids_only))
             print(json.dumps(res, ensure_ascii=False, indent=2), file=sys.stderr)
         else:
             # 默认展示 info
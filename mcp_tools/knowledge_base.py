@@ -12,7 +12,9 @@
 - 将知识库信息保存到独立的配置文件中，与原始数据分离存储
 
 数据存储逻辑：
-- 知识库数据存储在 config/knowledge_base_config.json 中
+- 知识库汇总数据存储在 config/knowledge_base_config.json 中
+- 逐条需求分析结果以 JSONL 格式增量写入 config/knowledge_base_requirements.jsonl，
+  配置文件中仅保存其文件名（requirements_jsonl 字段），可通过 iter_requirements() 逐条读取
 - 采用与 test_case_require_list_knowledge_base.py 相同的文件管理方式
 - 原始 TAPD 数据文件保持不变，仅作为数据源读取
 
@@ -21,20 +23,27 @@
 
 函数说明：
 - enhance_tapd_data_with_knowledge：知识库查询和分析函数
+- _get_knowledge_base_manager：获取按配置文件修改时间失效的缓存管理器实例
+- _analyze_story：分析单个需求
 - _extract_test_case_templates：提取并组织测试用例模板
 - _categorize_test_case：对测试用例标题进行分类
 - _extract_feature_type：基于关键词映射提取需求功能类型
-- _suggest_test_cases：为需求推荐测试用例
-- _extract_keywords：从文本中提取关键词
+- _build_test_case_suggestions：按功能类型预生成测试用例推荐
+- _extract_keywords_batch：批量分词并提取所有需求的关键词
 """
 
+import html
 import json
+import os
+import jieba
 import pandas as pd
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Iterator, NamedTuple, Optional, Pattern, Tuple
 from pathlib import Path
 import sys
 import re
+from collections import defaultdict
+from functools import lru_cache, partial
 
 # 添加项目根目录到路径
 current_dir = Path(__file__).parent
@@ -45,6 +54,81 @@ if str(project_root) not in sys.path:
 from mcp_tools.common_utils import get_config, get_file_manager
 
 
+# 简单的关键词映射：(关键词, 类型)，靠前的条目优先级更高
+_FEATURE_TYPE_KEYWORDS = (
+    ('登录', '用户认证'),
+    ('搜索', '搜索功能'),
+    ('上传', '文件操作'),
+    ('支付', '交易流程'),
+    ('权限', '权限管理'),
+)
+
+_TEST_CASE_CATEGORY_KEYWORDS = (
+    ('登录', '用户认证'), ('注册', '用户认证'), ('密码', '用户认证'),
+    ('搜索', '搜索功能'), ('查询', '搜索功能'), ('过滤', '搜索功能'),
+    ('上传', '文件操作'), ('下载', '文件操作'), ('文件', '文件操作'),
+    ('支付', '交易流程'), ('订单', '交易流程'), ('购买', '交易流程'),
+    ('权限', '权限管理'), ('角色', '权限管理'), ('授权', '权限管理'),
+)
+
+
+def _build_keyword_matcher(keyword_pairs) -> Tuple[Pattern[str], Dict[str, int], Tuple[str, ...]]:
+    """将关键词表预编译为单个正则交替式，一次扫描即可找出全部命中"""
+    ranks: Dict[str, int] = {}
+    for index, (keyword, _) in enumerate(keyword_pairs):
+        ranks.setdefault(keyword, index)
+    categories = tuple(category for _, category in keyword_pairs)
+    # 使用零宽前瞻捕获，保证相互重叠的关键词（如“授权限”）也都能被命中
+    alternation = '|'.join(re.escape(k) for k in sorted(ranks, key=len, reverse=True))
+    return re.compile(f'(?=({alternation}))'), ranks, categories
+
+
+# 每个需求最多提取的关键词数
+_MAX_KEYWORDS = 8
+# 关键词提取时过滤的通用词
+_KEYWORD_STOPWORDS = frozenset({'功能', '需求', '系统', '支持', '用户'})
+# 关键词映射中保留的关键词最少需关联的需求数，过滤仅出现一次的长尾词以控制体积
+_MIN_KEYWORD_OCCURRENCES = 2
+# 批量分词时用于分隔各需求文本的控制字符（jieba 会将其作为独立词元输出）
+_KEYWORD_SEPARATOR = '\x1f'
+
+# HTML 清理用的预编译正则
+_HTML_HIDDEN_BLOCK_RE = re.compile(r'<(script|style)\b[^>]*>.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+_FEATURE_TYPE_MATCHER = _build_keyword_matcher(_FEATURE_TYPE_KEYWORDS)
+_TEST_CASE_CATEGORY_MATCHER = _build_keyword_matcher(_TEST_CASE_CATEGORY_KEYWORDS)
+
+
+def _match_keyword_rank(text: str, matcher) -> Optional[int]:
+    """返回文本中命中的最高优先级关键词序号，未命中返回 None"""
+    if not text:
+        return None
+    pattern, ranks, _ = matcher
+    return min((ranks[m] for m in pattern.findall(text)), default=None)
+
+
+class RequirementAnalysis(NamedTuple):
+    """
+    单个需求的分析结果
+    
+    使用元组而非字典：每条记录不再携带键名，内存占用更小；
+    写入文件时通过 _asdict() 转换，字段顺序即输出JSON的键顺序
+    """
+    requirement_id: str
+    title: str
+    description_preview: str
+    status: str
+    priority: str
+    creator: str
+    feature_type: str
+    test_case_suggestions: List[str]
+    keywords: List[str]
+    created: str
+    modified: str
+    analysis_time: str
+
+
 class HistoryRequirementKnowledgeBase:
     """历史需求知识库管理器"""
     
@@ -56,7 +140,19 @@ class HistoryRequirementKnowledgeBase:
         # 确保config目录存在
         config_dir.mkdir(exist_ok=True)
         self.config_file = config_dir / "knowledge_base_config.json"
+        self.requirements_file = config_dir / "knowledge_base_requirements.jsonl"
+        # 已加载/保存的配置文件修改时间，用于判断模块级缓存实例是否过期
+        self.loaded_mtime = self._config_mtime()
         self.knowledge_base = self._load_knowledge_base()
+        # 预先加载 jieba 词典，避免首个需求分词时承担冷启动开销（重复调用无副作用）
+        jieba.initialize()
+    
+    def _config_mtime(self) -> float:
+        """返回配置文件的修改时间，文件不存在时返回0"""
+        try:
+            return self.config_file.stat().st_mtime
+        except OSError:
+            return 0.0
     
     def _load_knowledge_base(self) -> Dict[str, Any]:
         """加载知识库配置"""
@@ -65,7 +161,7 @@ class HistoryRequirementKnowledgeBase:
                 data = self.file_manager.load_json_data(str(self.config_file))
                 return data
             return {
-                'requirements_analysis': [],
+                'requirements_jsonl': self.requirements_file.name,
                 'test_case_templates': {},
                 'feature_types': {},
                 'keywords_mapping': {},
@@ -75,7 +171,7 @@ class HistoryRequirementKnowledgeBase:
         except Exception as e:
             print(f"❌ 加载知识库配置失败: {e}")
             return {
-                'requirements_analysis': [],
+                'requirements_jsonl': self.requirements_file.name,
                 'test_case_templates': {},
                 'feature_types': {},
                 'keywords_mapping': {},
@@ -83,29 +179,53 @@ class HistoryRequirementKnowledgeBase:
                 'last_updated': None
             }
     
-    def _save_knowledge_base(self):
-        """保存知识库配置"""
+    def _save_knowledge_base(self, updated_at: Optional[str] = None):
+        """保存知识库配置，updated_at 为空时使用当前时间"""
         try:
-            self.knowledge_base['last_updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self.knowledge_base['last_updated'] = updated_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             self.file_manager.save_json_data(self.knowledge_base, str(self.config_file))
+            self.loaded_mtime = self._config_mtime()
             print(f"✅ 知识库配置已保存到: {self.config_file}")
         except Exception as e:
             print(f"❌ 保存知识库配置失败: {e}")
+    
+    def iter_requirements(self) -> Iterator[Dict[str, Any]]:
+        """逐条读取需求分析结果，兼容旧版将结果内嵌在配置文件中的格式"""
+        if self.requirements_file.exists():
+            with open(self.requirements_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        else:
+            yield from self.knowledge_base.get('requirements_analysis', [])
 
-    def _extract_text_from_html(self, html_text: str) -> str:
+    @staticmethod
+    def _extract_text_from_html(html_text: str) -> str:
         """从HTML文本中提取纯文本内容"""
         if not html_text:
             return ""
         
-        # 简单的HTML标签清理
-        text = re.sub(r'<[^>]+>', '', html_text)
-        # 处理HTML实体
-        text = text.replace('&nbsp;', ' ').replace('&amp;', '&').replace('&lt;', '<').replace('&gt;', '>')
+        # 去除 <script>/<style> 块及其内容，其余标签替换为空格，避免相邻段落文字粘连
+        text = _HTML_HIDDEN_BLOCK_RE.sub(' ', html_text)
+        text = _HTML_TAG_RE.sub(' ', text)
+        # 单次扫描解码全部HTML实体（含命名实体与数字实体）
+        text = html.unescape(text)
         # 清理多余空白
         text = ' '.join(text.split())
         return text.strip()
 
 
+_kb_manager: Optional[HistoryRequirementKnowledgeBase] = None
+
+
+def _get_knowledge_base_manager() -> HistoryRequirementKnowledgeBase:
+    """获取缓存的知识库管理器，配置文件被外部修改（修改时间变化）时重新加载"""
+    global _kb_manager
+    if _kb_manager is None or _kb_manager.loaded_mtime != _kb_manager._config_mtime():
+        _kb_manager = HistoryRequirementKnowledgeBase()
+    return _kb_manager
+
+
 def enhance_tapd_data_with_knowledge(tapd_file: str = "local_data/msg_from_fetcher.json",
                                     testcase_file: Optional[str] = None) -> Dict[str, Any]:
     """
@@ -113,8 +233,8 @@ def enhance_tapd_data_with_knowledge(tapd_file: str = "local_data/msg_from_fetch
     仅读取原始数据，不修改原始文件，知识库信息保存到独立配置文件
     """
     try:
-        # 初始化知识库管理器
-        kb_manager = HistoryRequirementKnowledgeBase()
+        # 获取知识库管理器（配置文件未变化时复用缓存实例）
+        kb_manager = _get_knowledge_base_manager()
         
         # 加载原始TAPD数据（仅读取）
         tapd_data = kb_manager.file_manager.load_tapd_data(tapd_file)
@@ -132,81 +252,128 @@ def enhance_tapd_data_with_knowledge(tapd_file: str = "local_data/msg_from_fetch
             test_case_templates = _extract_test_case_templates(testcase_file)
         
         # 分析需求数据并生成知识库信息
-        analyzed_requirements = []
-        feature_types = {}
-        keywords_mapping = {}
+        analyzed_count = 0
+        feature_types = defaultdict(int)
+        keywords_mapping = defaultdict(list)
         
-        for story in stories:
-            # 提取基本信息
-            story_id = story.get('id', '')
-            title = story.get('name', '')
-            description = kb_manager._extract_text_from_html(story.get('description', ''))
-            
-            # 分析功能类型
-            feature_type = _extract_feature_type(story)
-            if feature_type not in feature_types:
-                feature_types[feature_type] = 0
-            feature_types[feature_type] += 1
-            
-            # 生成测试用例建议
-            test_case_suggestions = _suggest_test_cases(story, test_case_templates)
-            
-            # 提取关键词
-            keywords = _extract_keywords(story)
-            for keyword in keywords:
-                if keyword not in keywords_mapping:
-                    keywords_mapping[keyword] = []
-                keywords_mapping[keyword].append({
-                    'story_id': story_id,
-                    'title': title[:50] + '...' if len(title) > 50 else title
-                })
-            
-            # 构建分析结果
-            requirement_analysis = {
-                'requirement_id': story_id,
-                'title': title,
-                'description_preview': description[:200] + '...' if len(description) > 200 else description,
-                'status': story.get('status', ''),
-                'priority': story.get('priority', ''),
-                'creator': story.get('creator', ''),
-                'feature_type': feature_type,
-                'test_case_suggestions': test_case_suggestions,
-                'keywords': keywords,
-                'created': story.get('created', ''),
-                'modified': story.get('modified', ''),
-                'analysis_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            analyzed_requirements.append(requirement_analysis)
+        # 每个需求的描述只清理一次HTML，分词与分析共用清理后的纯文本
+        descriptions = [
+            HistoryRequirementKnowledgeBase._extract_text_from_html(story.get('description', ''))
+            for story in stories
+        ]
+        # 一次性完成所有需求的分词
+        keywords_per_story = _extract_keywords_batch(stories, descriptions)
+        
+        # 逐个需求分析（分词已在上一步批量完成，单个需求只剩少量正则匹配，在当前进程中顺序处理即可）
+        suggestions_by_type = _build_test_case_suggestions(test_case_templates)
+        # 本次分析统一使用同一时间戳
+        analysis_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        analyze = partial(_analyze_story, suggestions_by_type=suggestions_by_type,
+                          analysis_time=analysis_time)
+        results = map(analyze, zip(stories, descriptions, keywords_per_story))
+        
+        # 汇总统计信息，分析结果逐条写入临时 JSONL，不在内存中累积；全部完成后再替换正式文件，
+        # 分析中途失败时旧的 JSONL 与配置保持一致
+        requirements_tmp = kb_manager.requirements_file.with_name(kb_manager.requirements_file.name + '.tmp')
+        try:
+            with open(requirements_tmp, 'w', encoding='utf-8') as requirements_out:
+                for requirement_analysis in results:
+                    feature_types[requirement_analysis.feature_type] += 1
+                    
+                    # 关键词映射（标题预览每个需求只截取一次）
+                    title = requirement_analysis.title
+                    title_preview = title[:50] + '...' if len(title) > 50 else title
+                    for keyword in requirement_analysis.keywords:
+                        keywords_mapping[keyword].append({
+                            'story_id': requirement_analysis.requirement_id,
+                            'title': title_preview
+                        })
+                    
+                    requirements_out.write(json.dumps(requirement_analysis._asdict(), ensure_ascii=False))
+                    requirements_out.write('\n')
+                    analyzed_count += 1
+        except BaseException:
+            requirements_tmp.unlink(missing_ok=True)
+            raise
         
-        # 更新知识库
+        # 仅保留被多个需求共同引用的关键词
+        keywords_mapping = {
+            keyword: refs for keyword, refs in keywords_mapping.items()
+            if len(refs) >= _MIN_KEYWORD_OCCURRENCES
+        }
+        
+        # 更新知识库（移除旧版内嵌的需求分析列表）
+        kb_manager.knowledge_base.pop('requirements_analysis', None)
         kb_manager.knowledge_base.update({
-            'requirements_analysis': analyzed_requirements,
+            'requirements_jsonl': kb_manager.requirements_file.name,
             'test_case_templates': test_case_templates,
-            'feature_types': feature_types,
+            'feature_types': dict(feature_types),
             'keywords_mapping': keywords_mapping,
-            'total_count': len(analyzed_requirements)
+            'total_count': analyzed_count
         })
         
-        # 保存知识库配置
-        kb_manager._save_knowledge_base()
+        # 替换需求分析 JSONL 后立即保存知识库配置
+        os.replace(requirements_tmp, kb_manager.requirements_file)
+        kb_manager._save_knowledge_base(analysis_time)
         
         return {
             "status": "success",
             "message": f"知识库分析完成，已保存到 {kb_manager.config_file.name}",
-            "analyzed_requirements": len(analyzed_requirements),
+            "analyzed_requirements": analyzed_count,
             "test_templates": len(test_case_templates),
             "feature_types_count": len(feature_types),
             "unique_keywords": len(keywords_mapping),
-            "config_file": str(kb_manager.config_file)
+            "config_file": str(kb_manager.config_file),
+            "requirements_file": str(kb_manager.requirements_file)
         }
         
     except Exception as e:
         return {"status": "error", "message": f"知识库分析失败: {str(e)}"}
 
 
+def _analyze_story(story_item: Tuple[Dict, str, List[str]],
+                   suggestions_by_type: Dict[str, List[str]],
+                   analysis_time: str) -> RequirementAnalysis:
+    """分析单个需求（HTML清理与分词已批量完成，此处只做功能类型匹配与结果组装）"""
+    story, description, keywords = story_item
+    
+    # 提取基本信息（description 为清理HTML后的纯文本）
+    story_id = story.get('id', '')
+    title = story.get('name', '')
+    
+    # 分析功能类型（每个需求仅计算一次，供统计与推荐复用；匹配清理后的纯文本而非原始HTML）
+    # 标题与描述以空格拼接为一段文本，只转换一次小写、扫描一次；描述为空时直接使用标题
+    feature_type = _extract_feature_type(f"{title} {description}".lower() if description else title.lower())
+    
+    # 生成测试用例建议
+    test_case_suggestions = suggestions_by_type.get(feature_type, [])
+    
+    # 构建分析结果
+    return RequirementAnalysis(
+        requirement_id=story_id,
+        title=title,
+        description_preview=description[:200] + '...' if len(description) > 200 else description,
+        status=story.get('status', ''),
+        priority=story.get('priority', ''),
+        creator=story.get('creator', ''),
+        feature_type=feature_type,
+        test_case_suggestions=test_case_suggestions,
+        keywords=keywords,
+        created=story.get('created', ''),
+        modified=story.get('modified', ''),
+        analysis_time=analysis_time
+    )
+
+
 def _extract_test_case_templates(testcase_file: str) -> Dict[str, Any]:
-    """提取测试用例模板"""
+    """提取测试用例模板（文件未修改时复用上次的解析结果）"""
+    path = Path(testcase_file).resolve()
+    return _parse_test_case_templates(str(path), path.stat().st_mtime)
+
+
+@lru_cache(maxsize=4)
+def _parse_test_case_templates(testcase_file: str, mtime: float) -> Dict[str, Any]:
+    """解析测试用例Excel并按类型组织模板，mtime 仅作为缓存键"""
     try:
         df = pd.read_excel(testcase_file)
         
@@ -241,70 +408,62 @@ def _extract_test_case_templates(testcase_file: str) -> Dict[str, Any]:
         return {}
 
 
+@lru_cache(maxsize=4096)
 def _categorize_test_case(title: str) -> str:
-    """对测试用例进行简单分类"""
-    title_lower = title.lower()
-    
-    if any(word in title_lower for word in ['登录', '注册', '密码']):
-        return "用户认证"
-    elif any(word in title_lower for word in ['搜索', '查询', '过滤']):
-        return "搜索功能"
-    elif any(word in title_lower for word in ['上传', '下载', '文件']):
-        return "文件操作"
-    elif any(word in title_lower for word in ['支付', '订单', '购买']):
-        return "交易流程"
-    elif any(word in title_lower for word in ['权限', '角色', '授权']):
-        return "权限管理"
-    else:
+    """对测试用例进行简单分类（纯函数，按标题缓存结果）"""
+    rank = _match_keyword_rank(title.lower(), _TEST_CASE_CATEGORY_MATCHER)
+    if rank is None:
         return "通用功能"
+    return _TEST_CASE_CATEGORY_MATCHER[2][rank]
 
 
-def _extract_feature_type(story: Dict) -> str:
-    """从需求中提取功能类型"""
-    name = story.get('name', '').lower()
-    description = story.get('description', '').lower()
-    
-    # 简单的关键词映射
-    type_keywords = {
-        '登录': '用户认证',
-        '搜索': '搜索功能',
-        '上传': '文件操作',
-        '支付': '交易流程',
-        '权限': '权限管理'
-    }
-    
-    for keyword, feature_type in type_keywords.items():
-        if keyword in name or keyword in description:
-            return feature_type
+@lru_cache(maxsize=8192)
+def _extract_feature_type(text: str) -> str:
+    """
+    从需求中提取功能类型
     
-    return "通用功能"
+    text 为调用方拼接并转为小写的“标题 描述”文本，描述为清理HTML后的纯文本（纯函数，结果可缓存）
+    """
+    rank = _match_keyword_rank(text, _FEATURE_TYPE_MATCHER)
+    if rank is None:
+        return "通用功能"
+    return _FEATURE_TYPE_MATCHER[2][rank]
 
 
-def _suggest_test_cases(story: Dict, templates: Dict) -> List[str]:
-    """为需求推荐测试用例"""
-    feature_type = _extract_feature_type(story)
-    
-    suggestions = []
-    if feature_type in templates:
-        # 取前3个最相关的测试用例标题
-        examples = templates[feature_type]["examples"][:3]
-        suggestions = [example["title"] for example in examples]
-    
-    return suggestions
+def _build_test_case_suggestions(templates: Dict) -> Dict[str, List[str]]:
+    """预先为每种功能类型生成推荐的测试用例标题（取前3个），需求分析时直接查表"""
+    return {
+        feature_type: [example["title"] for example in template["examples"][:3]]
+        for feature_type, template in templates.items()
+    }
 
 
-def _extract_keywords(story: Dict) -> List[str]:
-    """提取关键词"""
-    import jieba
+def _extract_keywords_batch(stories: List[Dict], descriptions: List[str]) -> List[List[str]]:
+    """
+    批量提取关键词：将所有需求的标题与纯文本描述拼接后一次性分词，再按分隔符拆回各需求
+    
+    descriptions 为与 stories 一一对应、已清理HTML的描述，避免标签名、样式与实体名占满关键词名额
     
-    content = f"{story.get('name', '')} {story.get('description', '')}"
-    words = jieba.cut(content)
+    始终在当前进程中分词：MCP 服务进程持有 torch 与线程池线程，不在其中 fork 子进程
+    """
+    contents = [
+        f"{story.get('name', '')} {description}".replace(_KEYWORD_SEPARATOR, ' ')
+        for story, description in zip(stories, descriptions)
+    ]
+    corpus = _KEYWORD_SEPARATOR.join(contents)
     
-    # 过滤有意义的词汇
-    meaningful_words = [word for word in words 
-                       if len(word) > 1 and word not in ['功能', '需求', '系统', '支持', '用户']]
+    # 边分词边过滤：每个需求只保留按出现顺序去重后的前 _MAX_KEYWORDS 个关键词，不缓存全部词元
+    keywords_per_story: List[List[str]] = []
+    seen: Dict[str, None] = {}
+    for word in jieba.cut(corpus, HMM=False):
+        if word == _KEYWORD_SEPARATOR:
+            keywords_per_story.append(list(seen))
+            seen = {}
+        elif len(seen) < _MAX_KEYWORDS and len(word) > 1 and word not in _KEYWORD_STOPWORDS:
+            seen[word] = None
+    keywords_per_story.append(list(seen))
     
-    return list(set(meaningful_words))[:8]  # 最多8个关键词
+    return keywords_per_story
 
 
 if __name__ == "__main__":
@@ -331,5 +490,6 @@ if __name__ == "__main__":
         print(f"功能类型数: {result['feature_types_count']}")
         print(f"关键词数: {result['unique_keywords']}")
         print(f"配置文件: {result['config_file']}")
+        print(f"需求分析文件: {result['requirements_file']}")
     else:
         print(f"\n❌ {result['message']}")
\ No newline at end of file
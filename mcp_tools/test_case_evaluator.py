@@ -26,10 +26,11 @@ AI 测试用例评估器
       token 分配策略。
     - `_build_dynamic_prompt_template`: 根据规则动态构建发送给 LLM 的提示词模板。
     - `estimate_batch_tokens`: 估算一个批次的测试用例在组合成单个请求后所需的 token 总量。
+    - `estimate_case_tokens`: 逐个估算单个用例的 token 数量，供分批时累加使用。
     - `split_test_cases_by_tokens`: 根据 token 阈值将所有用例分割成多个批次。
     - `evaluate_batch`: 对单个批次的测试用例执行 AI 评估，发送异步请求并获取结果。
     - `parse_evaluation_result`: 解析 AI 返回的 Markdown 格式的评估结果。
-    - `evaluate_test_cases`: 编排整个评估流程，从批次分割到结果汇总。
+    - `evaluate_test_cases`: 编排整个评估流程，先完成批次分割，再以有限并发评估各批次并汇总结果。
 
 处理流程：
 1.  `main_process` 函数启动处理流程。
@@ -37,7 +38,7 @@ AI 测试用例评估器
 3.  `TestCaseEvaluator` 加载所有测试用例。
 4.  `split_test_cases_by_tokens` 方法根据 `token_threshold` 将用例分割成多个批次。
 5.  对于每个批次，`evaluate_batch` 方法构建一个包含该批次所有用例的提示词，并异步调用
-    LLM API。
+    LLM API（最多 `max_parallel_batches` 个批次同时进行）。
 6.  `parse_evaluation_result` 方法解析返回的 Markdown 表格，提取每个用例的评分和建议。
 7.  所有批次处理完成后，结果被汇总并保存到 `Proceed_TestCase_...json` 文件中。
 
@@ -49,6 +50,7 @@ AI 测试用例评估器
 import re
 import json
 import asyncio
+import logging
 import aiohttp
 import pandas as pd
 import sys
@@ -65,12 +67,21 @@ if str(project_root) not in sys.path:
 if str(mcp_tools_path) not in sys.path:
     sys.path.insert(0, str(mcp_tools_path))
 
+# 可选依赖：安装 orjson 后用于加速用例JSON的序列化与加载，未安装时回退到标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # 导入公共工具
 from common_utils import (
     get_config,
     get_api_manager,
     get_file_manager,
     get_token_counter,
+    get_response_cache,
+    get_rate_limiter,
+    ResponseCache,
     BatchingUtils,
     MarkdownUtils,
     TokenBudgetUtils,
@@ -78,6 +89,22 @@ from common_utils import (
 from test_case_rules_customer import get_test_case_rules
 from test_case_require_list_knowledge_base import RequirementKnowledgeBase
 
+# 逐字段解析、批次用例ID与原始返回预览等高频明细输出走 DEBUG 日志，默认不打印
+logger = logging.getLogger(__name__)
+
+# 判断剩余用例能否整体放入单批时，JSON字符数超过“单边预算×该值”即视为放不下，不再计数
+_MAX_CHARS_PER_TOKEN = 8
+
+# 用例ID行中未使用<br>分隔时，按8位以上的数字提取用例ID
+_CASE_ID_DIGITS_PATTERN = re.compile(r'\d{8,}')
+
+
+def _dumps_request_json(obj: Any) -> str:
+    """序列化API请求体：直接输出UTF-8中文（aiohttp默认的 json.dumps 会把每个中文字符转义为 \\uXXXX，请求体约增大一倍）"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False)
+
 
 class TestCaseProcessor:
     """Excel测试用例处理器"""
@@ -111,8 +138,8 @@ class TestCaseProcessor:
                 '预期结果': 'expected_result',
             }
             json_data = self.file_manager.read_excel_with_mapping(excel_file_path, column_mapping)
-            with open(json_file_path, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, ensure_ascii=False, indent=2)
+            # 通过FileManager保存（安装 orjson 时一次性序列化为字节写入，否则流式写入）
+            self.file_manager.save_json_data(json_data, json_file_path)
             print(f"成功转换 {len(json_data)} 条测试用例数据到 {json_file_path}")
             return json_data
         except Exception as e:
@@ -122,11 +149,13 @@ class TestCaseProcessor:
 class TestCaseEvaluator:
     """测试用例AI评估器"""
     
-    def __init__(self, max_context_tokens: int = 8000):
+    def __init__(self, max_context_tokens: int = 8000, max_parallel_batches: int = 4):
         self.config = get_config()
         self.api_manager = get_api_manager()
         self.file_manager = get_file_manager()
         self.token_counter = get_token_counter()
+        self.response_cache = get_response_cache()
+        self.rate_limiter = get_rate_limiter()
         
         # 初始化需求单知识库
         self.requirement_kb = RequirementKnowledgeBase()
@@ -147,6 +176,10 @@ class TestCaseEvaluator:
         # 剩余可用tokens = 待处理用例tokens + 返回表格tokens（约等于待处理用例tokens）
         # 即：reserve + template + requirements + 2 * test_cases_tokens <= max_context
         self.max_context_tokens = max_context_tokens
+        # 同时评估的批次数上限（各批次为独立的LLM请求）
+        self.max_parallel_batches = max(1, max_parallel_batches)
+        # 待确认的响应缓存：id(批次列表) -> (批次列表, 缓存键, 模型, 响应, 是否来自缓存)；解析出评估结果后才写入缓存
+        self._pending_cache_entries: Dict[int, Tuple[List[Dict[str, Any]], str, str, str, bool]] = {}
 
         # 构建动态评估提示词模板
         self.evaluation_prompt_template = self._build_dynamic_prompt_template()
@@ -169,6 +202,26 @@ class TestCaseEvaluator:
         self.requirement_info_text = self.requirement_kb.get_requirements_for_evaluation()
         self.requirement_tokens = self.token_counter.count_tokens(self.requirement_info_text)
 
+        # 预渲染提示词：需求单全局不变，按 {test_cases_json} 切分为前后两段，评估时只需拼接用例JSON
+        prompt_prefix, _, self._prompt_suffix = self.evaluation_prompt_template.partition('{test_cases_json}')
+        self._prompt_prefix = prompt_prefix.replace('{requirement_info}', self.requirement_info_text)
+        # 前后两段的token数：每批完整提示词的token数 = 该值 + 用例JSON的token数
+        self._prompt_frame_tokens = (
+            self.token_counter.count_tokens(self._prompt_prefix)
+            + self.token_counter.count_tokens(self._prompt_suffix)
+        )
+
+        # 注入校验，帮助定位“未注入需求单”的问题
+        try:
+            assert "需求单信息" in self._prompt_prefix, "提示词中缺少需求单信息标题"
+            if self.requirement_info_text.strip():
+                # 取需求单首行进行存在性检查
+                first_line = self.requirement_info_text.strip().splitlines()[0]
+                if first_line:
+                    assert first_line in self._prompt_prefix, "需求单文本可能未正确注入提示词"
+        except AssertionError as _e:
+            print(f"[警告] 需求单注入校验失败: {_e}")
+
         # 20% 预留
         self.reserve_tokens = max(64, int(self.max_context_tokens * 0.20))
 
@@ -276,28 +329,115 @@ class TestCaseEvaluator:
             return 0
 
         # 仅对测试用例JSON进行计数，模板与需求单已单独预计算
-        test_cases_json = json.dumps(test_cases, ensure_ascii=False, indent=2)
-        return self.token_counter.count_tokens(test_cases_json)
+        return self.token_counter.count_tokens(self._dump_test_cases(test_cases))
+
+    @staticmethod
+    def _dump_test_cases(test_cases: List[Dict[str, Any]]) -> str:
+        """序列化测试用例列表（紧凑格式：缩进和分隔符后的空格只会增加请求token，不帮助模型理解）"""
+        if orjson is not None:
+            try:
+                return orjson.dumps(test_cases).decode('utf-8')
+            except TypeError:
+                pass  # 含 orjson 不支持的类型时回退到标准库（两者输出格式一致）
+        return json.dumps(test_cases, ensure_ascii=False, separators=(',', ':'))
+
+    def estimate_case_tokens(self, test_cases: List[Dict[str, Any]]) -> List[int]:
+        """
+        逐个估算测试用例JSON的token数量（每个用例只序列化、计数一次）
+
+        参数:
+            test_cases: 测试用例列表
+
+        返回:
+            与test_cases一一对应的token数列表
+        """
+        return self.token_counter.count_tokens_batch(
+            [self._dump_test_cases([case]) for case in test_cases]
+        )
     
+    def _fits_in_one_batch(self, test_cases: List[Dict[str, Any]]) -> Optional[Tuple[str, int]]:
+        """
+        判断一组用例能否整体放入单个批次
+
+        返回:
+            能放入时返回 (用例JSON, token数)，否则返回None
+        """
+        if not test_cases:
+            return None
+        test_cases_json = self._dump_test_cases(test_cases)
+        # 字符数远超预算时必然放不下，跳过较昂贵的token计数
+        if len(test_cases_json) > self.single_side_budget * _MAX_CHARS_PER_TOKEN:
+            return None
+        token_count = self.token_counter.count_tokens(test_cases_json)
+        if token_count > self.single_side_budget:
+            return None
+        return test_cases_json, token_count
+
     def split_test_cases_by_tokens(self, test_cases: List[Dict[str, Any]], 
-                                 start_index: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+                                 start_index: int = 0,
+                                 case_tokens: Optional[List[int]] = None) -> Tuple[List[Dict[str, Any]], int]:
         """
         根据token限制分割测试用例
         
         参数:
             test_cases: 全部测试用例列表
             start_index: 开始索引
+            case_tokens: 预先计算的每个用例token数（见 estimate_case_tokens），未提供时现场计算
             
         返回:
             (当前批次的测试用例, 下一批次的开始索引)
         """
-        # 基于“响应≈2×请求”的单边预算进行分批（仅统计请求侧的用例JSON部分）
-        batch, next_index, current_tokens = BatchingUtils.split_by_token_budget(
-            test_cases,
-            estimate_tokens_fn=self.estimate_batch_tokens,
-            token_threshold=self.single_side_budget,
-            start_index=start_index,
-        )
+        batch, _, _, next_index = self._split_batch(test_cases, start_index, case_tokens)
+        return batch, next_index
+
+    def _split_batch(self, test_cases: List[Dict[str, Any]], start_index: int = 0,
+                     case_tokens: Optional[List[int]] = None) -> Tuple[List[Dict[str, Any]], str, int, int]:
+        """
+        split_test_cases_by_tokens 的实现，额外返回批次的用例JSON与token数供 evaluate_batch 复用
+
+        返回:
+            (当前批次的测试用例, 用例JSON, 用例JSON的token数, 下一批次的开始索引)
+        """
+        if start_index >= len(test_cases):
+            return [], '', 0, start_index
+
+        fast_path = None
+        if case_tokens is None:
+            # 快速路径：剩余用例整体即可放入预算时直接成批，无需逐个计数
+            fast_path = self._fits_in_one_batch(test_cases[start_index:])
+            if fast_path is None:
+                case_tokens = [0] * start_index + self.estimate_case_tokens(test_cases[start_index:])
+
+        if fast_path is not None:
+            batch = test_cases[start_index:]
+            batch_json, current_tokens = fast_path
+        else:
+            # 基于“响应≈2×请求”的单边预算进行分批（仅统计请求侧的用例JSON部分）
+            # 先按单用例token数累加确定批次边界，再对整批JSON精确计数一次
+            next_index, _ = BatchingUtils.split_by_item_tokens(
+                case_tokens,
+                token_threshold=self.single_side_budget,
+                start_index=start_index,
+            )
+            batch = test_cases[start_index:next_index]
+            batch_json = self._dump_test_cases(batch)
+            current_tokens = self.token_counter.count_tokens(batch_json)
+            # 累加值与整批计数存在少量偏差：超限时从尾部回退，仍有余量时向后补足，
+            # 使批次边界与逐个加入、整批计数的贪心分批一致
+            if current_tokens > self.single_side_budget:
+                while current_tokens > self.single_side_budget and len(batch) > 1:
+                    batch.pop()
+                    batch_json = self._dump_test_cases(batch)
+                    current_tokens = self.token_counter.count_tokens(batch_json)
+            else:
+                while start_index + len(batch) < len(test_cases):
+                    candidate = batch + [test_cases[start_index + len(batch)]]
+                    candidate_json = self._dump_test_cases(candidate)
+                    candidate_tokens = self.token_counter.count_tokens(candidate_json)
+                    if candidate_tokens > self.single_side_budget:
+                        break
+                    batch, batch_json, current_tokens = candidate, candidate_json, candidate_tokens
+        next_index = start_index + len(batch)
 
         # 在“响应≈2×请求”的假设下，响应上限按“2×用例JSON tokens”取值
         request_tokens_est = current_tokens  # 仅用例JSON部分
@@ -319,68 +459,59 @@ class TestCaseEvaluator:
             + response_tokens_cap
         )
 
-        # 显示当前批次包含的测试用例ID与token预算
-        batch_ids = [case.get('test_case_id', 'N/A') for case in batch]
+        # 显示当前批次的token预算（用例ID明细见DEBUG日志）
         print(
             f"当前批次包含 {len(batch)} 个测试用例，预计tokens: 模板={self.template_base_tokens}, 需求={self.requirement_tokens}, "
             f"请求≈{request_tokens_est}, 响应上限≈{response_tokens_cap}, 预留={self.reserve_tokens}, "
             f"合计≈{total_estimated_tokens}（窗口={self.max_context_tokens}）"
         )
-        print(f"批次包含的用例ID: {', '.join(batch_ids)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            batch_ids = [str(case.get('test_case_id', 'N/A')) for case in batch]
+            logger.debug("批次包含的用例ID: %s", ', '.join(batch_ids))
         
-        return batch, next_index
+        return batch, batch_json, current_tokens, next_index
     
     async def evaluate_batch(self, test_cases: List[Dict[str, Any]], 
-                           session: aiohttp.ClientSession) -> str:
+                           session: aiohttp.ClientSession,
+                           test_cases_json: Optional[str] = None,
+                           request_cases_tokens: Optional[int] = None) -> str:
         """
         评估一批测试用例
         
         参数:
             test_cases: 测试用例列表
             session: HTTP会话
+            test_cases_json: 分批阶段已序列化的用例JSON，未提供时现场序列化
+            request_cases_tokens: 用例JSON的token数，未提供时现场计数
             
         返回:
             AI评估结果
         """
-        # 构建批量提示词 - 一次性处理多个测试用例
-        test_cases_json = json.dumps(test_cases, ensure_ascii=False, indent=2)
+        # 构建批量提示词 - 一次性处理多个测试用例（优先复用分批阶段的序列化结果与token计数）
+        if test_cases_json is None:
+            test_cases_json = self._dump_test_cases(test_cases)
+            request_cases_tokens = None
+        if request_cases_tokens is None:
+            request_cases_tokens = self.token_counter.count_tokens(test_cases_json)
 
         # 使用全局已缓存的需求单信息
         requirement_info = self.requirement_info_text
 
-        # 构建最终提示词
-        final_prompt = self.evaluation_prompt_template.format(
-            requirement_info=requirement_info,
-            test_cases_json=test_cases_json
-        )
-
-        # 运行期注入校验与简短预览，帮助定位“未注入需求单”的问题
-        try:
-            assert "需求单信息" in final_prompt, "提示词中缺少需求单信息标题"
-            if requirement_info.strip():
-                # 取需求单首行进行存在性检查
-                first_line = requirement_info.strip().splitlines()[0]
-                if first_line:
-                    assert first_line in final_prompt, "需求单文本可能未正确注入提示词"
-        except AssertionError as _e:
-            print(f"[警告] 需求单注入校验失败: {_e}")
+        # 构建最终提示词（前后两段已在初始化时渲染，需求单注入校验也已完成）
+        final_prompt = self._prompt_prefix + test_cases_json + self._prompt_suffix
         
         # 调试预览（只展示需求单与用例片段，避免日志过长）
-        try:
+        if logger.isEnabledFor(logging.DEBUG):
             req_preview = requirement_info[:200].replace('\n', ' ')
             cases_preview = test_cases_json[:200].replace('\n', ' ')
-            print(f"\n需求单片段: \n{req_preview}...")
-            print(f"用例JSON片段: \n{cases_preview}...\n")
-        except Exception:
-            pass
-
-        # 仅用例JSON的tokens（用于计算响应上限）
-        request_cases_tokens = self.token_counter.count_tokens(test_cases_json)
+            logger.debug("需求单片段: %s...", req_preview)
+            logger.debug("用例JSON片段: %s...", cases_preview)
 
         # 计算响应上限：取“2×用例”的理论值，并受总体预算限制
         theoretical_response_cap = request_cases_tokens * 2
         # 总体剩余额度（去掉预留、模板、需求及请求全部提示词后的剩余）
-        total_prompt_tokens = self.token_counter.count_tokens(final_prompt)
+        # 完整提示词每批不同，不整体计数，避免一次性长文本占满全局token计数缓存
+        total_prompt_tokens = self._prompt_frame_tokens + request_cases_tokens
         leftover_budget = max(0, self.max_context_tokens - self.reserve_tokens - total_prompt_tokens)
         dynamic_response_tokens = max(64, min(theoretical_response_cap, leftover_budget))
 
@@ -390,6 +521,20 @@ class TestCaseEvaluator:
         #     f"完整请求≈{total_prompt_tokens}, 响应tokens限制≈{dynamic_response_tokens}（响应≈2×请求JSON）"
         # )
         
+        # 相同提示词、模型与参数的请求优先从磁盘缓存读取（模式由环境变量 LLM_CACHE_MODE 控制）
+        _, use_model = self.api_manager.resolve_endpoint_and_model()
+        cache_key = ResponseCache.make_key(final_prompt, use_model, self.max_context_tokens)
+        cached_result = self.response_cache.get(cache_key)
+        if cached_result is not None:
+            print("命中LLM响应缓存，跳过API调用，开始解析结果...")
+            self._pending_cache_entries[id(test_cases)] = (test_cases, cache_key, use_model, cached_result, True)
+            return cached_result
+        if self.response_cache.mode == "replay":
+            raise RuntimeError(f"LLM响应缓存未命中（replay模式不调用API）: {cache_key}")
+
+        # 按 RPM/TPM 额度排队（预计消耗 = 完整提示词 + 响应上限）
+        await self.rate_limiter.acquire(total_prompt_tokens + dynamic_response_tokens)
+
         print("正在调用AI进行评估...")
         
         # 调用AI API（使用默认配置，支持环境变量自动检测）
@@ -398,6 +543,8 @@ class TestCaseEvaluator:
             session=session,
             max_tokens=self.max_context_tokens
         )
+        # 先登记，待批次解析出评估结果后再写入缓存，避免无法解析的响应被反复重放
+        self._pending_cache_entries[id(test_cases)] = (test_cases, cache_key, use_model, result, False)
         
         print("AI评估完成，开始解析结果...")
         return result
@@ -426,7 +573,7 @@ class TestCaseEvaluator:
         for idx, tbl in enumerate(tables):
             headers = tbl.get("headers", [])
             rows = tbl.get("rows", [])
-            print(f"解析第 {idx + 1} 个表格，包含 {len(rows)} 行")
+            logger.debug("解析第 %d 个表格，包含 %d 行", idx + 1, len(rows))
 
             current_case: Optional[Dict[str, Any]] = None
             case_id: Optional[str] = None
@@ -443,11 +590,11 @@ class TestCaseEvaluator:
                     if '<br>' in field_info:
                         id_part = field_info.split('<br>')[-1].strip()
                     else:
-                        id_match = re.search(r'\d{8,}', field_info)
+                        id_match = _CASE_ID_DIGITS_PATTERN.search(field_info)
                         id_part = id_match.group() if id_match else field_info.replace('**用例ID**', '').strip()
 
                     case_id = id_part
-                    print(f"  正在解析用例ID: {case_id}")
+                    logger.debug("  正在解析用例ID: %s", case_id)
                     if current_case:
                         evaluations.append(current_case)
                     current_case = {'test_case_id': case_id, 'evaluations': []}
@@ -471,7 +618,7 @@ class TestCaseEvaluator:
                     field_name = field_name.replace('*', '').strip()
                     field_content = field_content.replace('*', '').strip()
 
-                    print(f"    解析字段: {field_name} (分数: {score if score != '-' else '无'})")
+                    logger.debug("    解析字段: %s (分数: %s)", field_name, score if score != '-' else '无')
                     evaluation_item = {
                         'field': field_name,
                         'content': field_content,
@@ -482,7 +629,7 @@ class TestCaseEvaluator:
 
             if current_case:
                 evaluations.append(current_case)
-                print(f"  完成用例解析: {current_case['test_case_id']}")
+                logger.debug("  完成用例解析: %s", current_case['test_case_id'])
 
         print(f"成功解析 {len(evaluations)} 个用例的评估结果")
         if evaluations:
@@ -493,10 +640,84 @@ class TestCaseEvaluator:
 
         return evaluations
     
+    def _settle_cached_response(self, test_cases: List[Dict[str, Any]], parsed_ok: bool) -> None:
+        """批次解析完成后处理登记的响应：解析出结果的新响应写入缓存，无法解析的缓存响应从缓存删除"""
+        pending = self._pending_cache_entries.pop(id(test_cases), None)
+        if pending is None or pending[0] is not test_cases:
+            return
+        _, cache_key, use_model, result, from_cache = pending
+        if parsed_ok and not from_cache:
+            self.response_cache.put(cache_key, result, use_model, self.max_context_tokens)
+        elif not parsed_ok and from_cache:
+            self.response_cache.discard(cache_key)
+
+    async def _evaluate_one_batch(self, batch_number: int, batch: Tuple[List[Dict[str, Any]], str, int],
+                                  session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                                  test_batch_count: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        在并发上限内评估并解析单个批次，失败时返回空列表以便其他批次继续
+
+        参数:
+            batch_number: 批次序号（从1开始）
+            batch: 当前批次的 (测试用例, 用例JSON, 用例JSON的token数)
+            session: HTTP会话
+            semaphore: 限制同时进行的批次数
+            test_batch_count: 测试数据批次，1表示只处理第一批
+
+        返回:
+            当前批次的评估结果列表
+        """
+        batch_cases, batch_json, batch_tokens = batch
+        try:
+            async with semaphore:
+                print(f"开始处理第 {batch_number} 批次（{len(batch_cases)} 个用例）...")
+                # 评估当前批次
+                ai_result = await self.evaluate_batch(batch_cases, session, batch_json, batch_tokens)
+            print(f"第 {batch_number} 批次AI返回结果长度: {len(ai_result)}")
+            logger.debug("第 %d 批次AI返回结果:\n%s", batch_number, ai_result)
+            
+            # 解析结果
+            batch_evaluations = self.parse_evaluation_result(ai_result)
+            self._settle_cached_response(batch_cases, bool(batch_evaluations))
+            
+            # 显示本批次处理结果（用例ID明细见DEBUG日志）
+            print(f"第 {batch_number} 批次处理完成，评估了 {len(batch_evaluations)} 个用例")
+            if logger.isEnabledFor(logging.DEBUG):
+                processed_ids = [eval_result['test_case_id'] for eval_result in batch_evaluations]
+                logger.debug("已完成评估的用例ID: %s", ', '.join(processed_ids))
+            
+            # 如果是测试模式且第一批次完成，显示预览
+            if test_batch_count == 1 and batch_number == 1:
+                print(f"\n第一批次测试完成，评估结果预览:")
+                if batch_evaluations:
+                    first_eval = batch_evaluations[0]
+                    print(f"用例ID: {first_eval['test_case_id']}")
+                    print(f"评估项数量: {len(first_eval['evaluations'])}")
+                    # 显示第一个评估项的详细信息
+                    if first_eval['evaluations']:
+                        first_item = first_eval['evaluations'][0]
+                        print(f"示例评估 - {first_item['field']}: 分数={first_item.get('score', '无')}, 建议={first_item.get('suggestion', '无')}")
+                else:
+                    print("解析评估结果失败，可能需要调整解析逻辑")
+                    print(f"AI原始返回: {ai_result[:500]}...")
+                print("\n如需处理更多批次，请修改 test_batch_count 参数")
+            return batch_evaluations
+            
+        except Exception as e:
+            self._pending_cache_entries.pop(id(batch_cases), None)
+            print(f"第 {batch_number} 批次处理失败: {str(e)}")
+            if test_batch_count == 1:
+                print("测试批次失败，请检查API配置和网络连接")
+            else:
+                print("跳过当前批次，继续处理其他批次")
+            return []
+
     async def evaluate_test_cases(self, test_cases: List[Dict[str, Any]], 
                                 test_batch_count: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         评估测试用例
+
+        先完成全部分批，再以 max_parallel_batches 为上限并发评估各批次，结果按批次顺序汇总
         
         参数:
             test_cases: 测试用例列表
@@ -505,80 +726,53 @@ class TestCaseEvaluator:
         返回:
             评估结果列表
         """
-        all_evaluations = []
+        # 每个用例只序列化并计数一次，分批时按累计值推进；全部用例可放入单批时无需逐个计数
+        case_tokens = None
+        if self._fits_in_one_batch(test_cases) is None:
+            case_tokens = self.estimate_case_tokens(test_cases)
+
+        batches: List[Tuple[List[Dict[str, Any]], str, int]] = []
         current_index = 0
-        batch_number = 1
-        
-        async with aiohttp.ClientSession() as session:
-            while current_index < len(test_cases):
-                # 如果设置了测试批次限制，检查是否超过
-                if test_batch_count and batch_number > test_batch_count:
-                    print(f"达到测试批次限制 ({test_batch_count})，停止处理")
-                    break
-                
-                # 显示总体进度
-                remaining_cases = len(test_cases) - current_index
-                progress_percent = (current_index / len(test_cases)) * 100
-                print(f"\n总体进度: {current_index}/{len(test_cases)} ({progress_percent:.1f}%), 剩余 {remaining_cases} 个用例")
-                print(f"开始处理第 {batch_number} 批次...")
-                
-                # 分割当前批次
-                batch_cases, next_index = self.split_test_cases_by_tokens(
-                    test_cases, current_index
-                )
-                
-                if not batch_cases:
-                    print("没有更多测试用例可处理")
-                    break
-                
-                try:
-                    # 评估当前批次
-                    ai_result = await self.evaluate_batch(batch_cases, session)
-                    print(f"AI返回结果长度: {len(ai_result)}")
-                    print(f"AI返回结果字符预览: ================================================================================")
-                    print(f"\n{ai_result}\n")
-                    print("====================================================================================================")
-                    
-                    # 解析结果
-                    batch_evaluations = self.parse_evaluation_result(ai_result)
-                    all_evaluations.extend(batch_evaluations)
-                    
-                    # 显示本批次处理的用例ID
-                    processed_ids = [eval_result['test_case_id'] for eval_result in batch_evaluations]
-                    print(f"第 {batch_number} 批次处理完成，评估了 {len(batch_evaluations)} 个用例")
-                    print(f"已完成评估的用例ID: {', '.join(processed_ids)}")
-                    
-                    # 如果是测试模式且第一批次完成，询问是否继续
-                    if test_batch_count == 1 and batch_number == 1:
-                        print(f"\n第一批次测试完成，评估结果预览:")
-                        if batch_evaluations:
-                            first_eval = batch_evaluations[0]
-                            print(f"用例ID: {first_eval['test_case_id']}")
-                            print(f"评估项数量: {len(first_eval['evaluations'])}")
-                            # 显示第一个评估项的详细信息
-                            if first_eval['evaluations']:
-                                first_item = first_eval['evaluations'][0]
-                                print(f"示例评估 - {first_item['field']}: 分数={first_item.get('score', '无')}, 建议={first_item.get('suggestion', '无')}")
-                        else:
-                            print("解析评估结果失败，可能需要调整解析逻辑")
-                            print(f"AI原始返回: {ai_result[:500]}...")
-                        print("\n如需处理更多批次，请修改 test_batch_count 参数")
-                        break
-                    
-                except Exception as e:
-                    print(f"第 {batch_number} 批次处理失败: {str(e)}")
-                    if test_batch_count == 1:
-                        print("测试批次失败，请检查API配置和网络连接")
-                        break
-                    else:
-                        print("跳过当前批次，继续处理下一批次")
-                
-                current_index = next_index
-                batch_number += 1
-                
-                # 批次间延迟，避免API限制
-                await asyncio.sleep(1)
-        
+        while current_index < len(test_cases):
+            # 如果设置了测试批次限制，检查是否超过
+            if test_batch_count and len(batches) >= test_batch_count:
+                print(f"达到测试批次限制 ({test_batch_count})，停止处理")
+                break
+            
+            # 分割当前批次（连同序列化结果一起交给评估，避免重复序列化与计数）
+            batch_cases, batch_json, batch_tokens, current_index = self._split_batch(
+                test_cases, current_index, case_tokens
+            )
+            
+            if not batch_cases:
+                print("没有更多测试用例可处理")
+                break
+            batches.append((batch_cases, batch_json, batch_tokens))
+
+        print(
+            f"\n共 {len(test_cases)} 个用例，分为 {len(batches)} 个批次，"
+            f"最多 {self.max_parallel_batches} 个批次并发评估"
+        )
+
+        semaphore = asyncio.Semaphore(self.max_parallel_batches)
+        # 连接池与并发批次数匹配，缓存DNS并保持长连接，使各批次复用已建立的TLS连接
+        connector = aiohttp.TCPConnector(
+            limit=self.max_parallel_batches * 2,
+            limit_per_host=self.max_parallel_batches,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+        )
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=300)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         json_serialize=_dumps_request_json) as session:
+            batch_results = await asyncio.gather(*[
+                self._evaluate_one_batch(batch_number, batch, session, semaphore, test_batch_count)
+                for batch_number, batch in enumerate(batches, start=1)
+            ])
+
+        all_evaluations = []
+        for batch_evaluations in batch_results:
+            all_evaluations.extend(batch_evaluations)
         return all_evaluations
 
 
@@ -640,8 +834,12 @@ async def main_process(test_batch_count: Optional[int] = None):
             test_cases = processor.excel_to_json(str(excel_file), str(json_file))
         else:
             print("JSON文件已存在，直接加载...")
-            with open(json_file, 'r', encoding='utf-8') as f:
-                test_cases = json.load(f)
+            if orjson is not None:
+                with open(json_file, 'rb') as f:
+                    test_cases = orjson.loads(f.read())
+            else:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    test_cases = json.load(f)
         
         print(f"加载了 {len(test_cases)} 条测试用例数据")
 
@@ -652,17 +850,19 @@ async def main_process(test_batch_count: Optional[int] = None):
         print(f"\n开始处理时间: {start_time_str}")
         
         # 分析测试用例的优先级分布
+        # 先按原始取值计数，再对每个不同取值做一次标准化（取值种类远少于用例数）
+        raw_level_counter = Counter(test_case.get('level', '') for test_case in test_cases)
         level_counter = Counter()
-        for test_case in test_cases:
-            level = test_case.get('level', '').strip().upper()
+        for raw_level, count in raw_level_counter.items():
+            level = raw_level.strip().upper()
             if level:
                 # 标准化优先级表示，例如P0、P1、P2
                 if level.startswith('P') and len(level) > 1 and level[1].isdigit():
-                    level_counter[level] += 1
+                    level_counter[level] += count
                 else:
-                    level_counter['其他'] += 1
+                    level_counter['其他'] += count
             else:
-                level_counter['未设置'] += 1
+                level_counter['未设置'] += count
         
         # 计算各优先级占比
         total_cases = len(test_cases)
@@ -707,6 +907,8 @@ async def main_process(test_batch_count: Optional[int] = None):
         print(f"\n开始AI评估{batch_limit_text}")
         print(f"总计需要评估 {len(test_cases)} 个测试用例")
         evaluations = await evaluator.evaluate_test_cases(test_cases, test_batch_count)
+        # 原始用例数据后续不再使用，保存结果前释放，降低序列化期间的内存峰值
+        del test_cases
         
         # 步骤4: 保存评估结果
         if evaluations:
@@ -752,6 +954,8 @@ async def main_process(test_batch_count: Optional[int] = None):
 
 
 if __name__ == "__main__":
+    # 明细日志默认关闭；排查解析问题时可将级别调为 logging.DEBUG
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print(
 r'''
  ______    __   __  ______    __        __  __    ______    ______   ______    ______   
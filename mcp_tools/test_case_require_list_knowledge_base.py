@@ -141,13 +141,18 @@ class RequirementKnowledgeBase:
                 print("❌ 未找到需求单数据")
                 return 0
             
-            extracted_count = 0
+            # 同一批次提取的需求共用一个本地创建时间
+            local_created_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            # 预先建立已有需求ID集合，避免每条需求都线性扫描全部已有需求
+            existing_ids = {req.get('requirement_id') for req in self.requirements}
+            new_requirements = []
             
             for story in stories:
                 # 检查是否已存在（根据ID）
                 story_id = story.get('id', '')
-                if any(req.get('requirement_id') == story_id for req in self.requirements):
+                if story_id in existing_ids:
                     continue
+                existing_ids.add(story_id)
                 
                 # 提取关键信息
                 requirement = {
@@ -163,7 +168,7 @@ class RequirementKnowledgeBase:
                     'version': story.get('version', ''),
                     'created': story.get('created', ''),
                     'modified': story.get('modified', ''),
-                    'local_created_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')  # 添加本地创建时间
+                    'local_created_time': local_created_time  # 添加本地创建时间
                 }
                 
                 # 尝试从描述中提取验收标准
@@ -184,9 +189,11 @@ class RequirementKnowledgeBase:
                                 break
                     requirement['acceptance_criteria'] = '\n'.join(acceptance_lines)
                 
-                self.requirements.append(requirement)
-                extracted_count += 1
+                new_requirements.append(requirement)
             
+            # 批量追加新需求
+            self.requirements.extend(new_requirements)
+            extracted_count = len(new_requirements)
             print(f"✅ 成功提取 {extracted_count} 个需求单")
             return extracted_count
             
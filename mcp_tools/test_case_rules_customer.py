@@ -15,7 +15,6 @@
 配置文件存储位置：config/test_case_rules.json
 """
 
-import json
 import argparse
 import sys
 from pathlib import Path
@@ -29,6 +28,16 @@ if str(project_root) not in sys.path:
 
 from mcp_tools.common_utils import get_config, get_file_manager
 
+# 必需的配置项
+_REQUIRED_KEYS = ("title_max_length", "max_steps", "priority_ratios")
+# 数值配置项的校验规则：(配置项, 最小值, 最大值, 错误提示)
+_NUMERIC_RULES = (
+    ("title_max_length", 1, 200, "标题长度限制应在1-200之间"),
+    ("max_steps", 1, 50, "步骤数上限应在1-50之间"),
+)
+# 需要配置占比的优先级
+_PRIORITY_LEVELS = ("P0", "P1", "P2")
+
 
 class TestCaseRulesCustomer:
     """测试用例规则自定义配置管理器"""
@@ -54,6 +63,8 @@ class TestCaseRulesCustomer:
             "version": "1.0",
             "last_updated": None
         }
+        # 最近一次 load_config 时磁盘上的配置文件是否有效（无效时即使未修改也需重新写盘）
+        self._config_file_valid = False
     
     def load_config(self) -> Dict[str, Any]:
         """
@@ -62,19 +73,21 @@ class TestCaseRulesCustomer:
         返回:
             配置字典，如果文件不存在则返回默认配置
         """
+        self._config_file_valid = False
         try:
             if self.config_file.exists():
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
+                # 通过FileManager读取（安装 orjson 时自动使用更快的解析）
+                config_data = self.file_manager.load_json_data(str(self.config_file))
                 # 验证配置完整性
                 if self._validate_config(config_data):
+                    self._config_file_valid = True
                     return config_data
                 else:
                     print("配置文件格式错误，使用默认配置")
                     return self.default_config.copy()
             else:
                 print("配置文件不存在，创建默认配置")
-                self.save_config(self.default_config)
+                self._config_file_valid = self.save_config(self.default_config)
                 return self.default_config.copy()
         except Exception as e:
             print(f"加载配置失败: {e}，使用默认配置")
@@ -114,24 +127,20 @@ class TestCaseRulesCustomer:
         """
         try:
             # 检查必需的键
-            required_keys = ["title_max_length", "max_steps", "priority_ratios"]
-            for key in required_keys:
+            for key in _REQUIRED_KEYS:
                 if key not in config_data:
                     print(f"缺少必需的配置项: {key}")
                     return False
             
             # 验证数值范围
-            if not (1 <= config_data["title_max_length"] <= 200):
-                print("标题长度限制应在1-200之间")
-                return False
-            
-            if not (1 <= config_data["max_steps"] <= 50):
-                print("步骤数上限应在1-50之间")
-                return False
+            for key, min_val, max_val, message in _NUMERIC_RULES:
+                if not (min_val <= config_data[key] <= max_val):
+                    print(message)
+                    return False
             
             # 验证优先级占比
             priority_ratios = config_data["priority_ratios"]
-            for priority in ["P0", "P1", "P2"]:
+            for priority in _PRIORITY_LEVELS:
                 if priority not in priority_ratios:
                     print(f"缺少优先级配置: {priority}")
                     return False
@@ -197,7 +206,7 @@ class TestCaseRulesCustomer:
         print("\n优先级占比配置（格式：最小值-最大值，如：10-20）：")
         priority_ratios = new_config["priority_ratios"].copy()
         
-        for priority in ["P0", "P1", "P2"]:
+        for priority in _PRIORITY_LEVELS:
             current_ratio = priority_ratios[priority]
             current_range = f"{current_ratio['min']}-{current_ratio['max']}"
             
@@ -223,6 +232,11 @@ class TestCaseRulesCustomer:
         
         new_config["priority_ratios"] = priority_ratios
         
+        # 配置未变化且磁盘上的配置文件有效时无需确认和写盘（文件损坏时仍需写回默认值修复）
+        if new_config == current_config and self._config_file_valid:
+            print("\n配置未发生变化，无需保存")
+            return
+        
         # 4. 确认并保存
         print("\n新配置预览：")
         self._display_config(new_config)
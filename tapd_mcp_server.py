@@ -218,7 +218,7 @@ async def vectorize_data(
             - 较小值：搜索更精准，但分片更多
             - 较大值：减少分片数量，但可能降低搜索精度
         preserve_existing (bool): 是否保留已有向量库文件（默认 False）。
-            - False: 默认行为，向量化前删除旧文件（.index/.metadata.pkl/.config.json）后重建
+            - False: 默认行为，向量化前删除旧文件（.index/.metadata.json/.config.json）后重建
             - True: 保留已有文件，不做删除
         
     返回:
@@ -419,7 +419,7 @@ async def get_vector_info() -> str:
         return json.dumps(error_result, ensure_ascii=False, indent=2)
 
 @mcp.tool()
-async def search_data(query: str, top_k: int = 5) -> str:
+async def search_data(query: str, top_k: int = 5, include_items: bool = True) -> str:
     """在向量化的TAPD数据中进行智能搜索
     
     功能描述:
@@ -431,12 +431,13 @@ async def search_data(query: str, top_k: int = 5) -> str:
     参数:
         query (str): 搜索查询，支持中文自然语言描述
         top_k (int): 每批返回的原始条目数量。最终返回两批数据（最高相似度的两个分片），每批 top_k 条。
+        include_items (bool): 是否返回原始条目（默认 True）。仅需分片与条目ID时设为 False，可显著减小响应体积。
         
     返回:
         str: 搜索结果的JSON字符串，包含：
             - batches: 返回的批次数（固定为2，若库不足可能小于2）
             - items_per_batch: 每批条目数量（即入参 top_k）
-            - results: 列表，每项为一批，含 batch_rank、relevance_score、chunk_info、items
+            - results: 列表，每项为一批，含 batch_rank、relevance_score、chunk_info、items（include_items=False 时不含 items）
         
     使用示例:
         - "查找订单相关的需求"
@@ -444,7 +445,7 @@ async def search_data(query: str, top_k: int = 5) -> str:
         - "高优先级的开发任务"
     """
     try:
-        result = await search_tapd_data(query, top_k)
+        result = await search_tapd_data(query, top_k, include_items)
         return json.dumps(result, ensure_ascii=False, indent=2)
     except Exception as e:
         error_result = {
@@ -842,6 +843,7 @@ async def enhance_tapd_with_knowledge(
         - 为每个需求分析功能类型、测试用例建议、关键词等
         - 仅读取原始数据文件，不修改原始TAPD数据
         - 知识库信息保存到 config/knowledge_base_config.json
+        - 逐条需求分析结果保存到 config/knowledge_base_requirements.jsonl
         - 采用与test_case_require_list_knowledge_base.py相同的数据管理方式
         
     参数:
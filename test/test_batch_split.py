@@ -0,0 +1,162 @@
+"""
+测试测试用例分批：BatchingUtils.split_by_item_tokens 与 TestCaseEvaluator.split_test_cases_by_tokens
+的批次边界应与“逐个加入、整批计数”的贪心分批一致，并覆盖起始索引靠近末尾、单个超大用例与空输入
+"""
+
+import contextlib
+import io
+import random
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from mcp_tools.common_utils import BatchingUtils, get_token_counter
+from mcp_tools.test_case_evaluator import TestCaseEvaluator
+
+
+class _CharCounter:
+    """按字符数计数：整批JSON比单用例JSON之和少（括号合并），用于检验分批对累加偏差的修正"""
+
+    def count_tokens(self, text):
+        return len(text)
+
+    def count_tokens_batch(self, texts):
+        return [len(text) for text in texts]
+
+
+def _make_cases(count, seed=1):
+    rng = random.Random(seed)
+    return [
+        {
+            'test_case_id': str(i),
+            'test_case_title': '验证功能' * rng.randint(1, 10),
+            'step_description': '1. 输入 abc\n2. 点击' * rng.randint(1, 8),
+            'expected_result': '成功',
+        }
+        for i in range(count)
+    ]
+
+
+def _make_evaluator(token_counter, budget):
+    """跳过初始化（需求单、规则与提示词），只保留分批需要的属性"""
+    evaluator = object.__new__(TestCaseEvaluator)
+    evaluator.token_counter = token_counter
+    evaluator.max_context_tokens = 8000
+    evaluator.reserve_tokens = 1600
+    evaluator.template_base_tokens = 900
+    evaluator.requirement_tokens = 500
+    evaluator.single_side_budget = budget
+    return evaluator
+
+
+def _greedy_item_split(item_tokens, threshold, start_index=0, base_tokens=0, separator_tokens=0):
+    """参考实现：逐项累加，首项总是收纳"""
+    running = base_tokens
+    index = start_index
+    while index < len(item_tokens):
+        cost = item_tokens[index] + (separator_tokens if index > start_index else 0)
+        if index > start_index and running + cost > threshold:
+            break
+        running += cost
+        index += 1
+    return index, (running if index > start_index else 0)
+
+
+def _greedy_case_split(evaluator, test_cases, start_index):
+    """参考实现（旧分批逻辑）：逐个加入用例，每次对整批JSON重新计数，首个用例总是收纳"""
+    if start_index >= len(test_cases):
+        return [], start_index
+    batch = [test_cases[start_index]]
+    for case in test_cases[start_index + 1:]:
+        if evaluator.estimate_batch_tokens(batch + [case]) > evaluator.single_side_budget:
+            break
+        batch.append(case)
+    return batch, start_index + len(batch)
+
+
+def _split(evaluator, test_cases, start_index, case_tokens):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return evaluator.split_test_cases_by_tokens(test_cases, start_index, case_tokens)
+
+
+def test_split_by_item_tokens():
+    """与逐项累加的参考实现一致"""
+    rng = random.Random(2)
+    item_tokens = [rng.randint(1, 50) for _ in range(200)]
+    for threshold in (1, 30, 100, 1000, 10 ** 6):
+        for base_tokens, separator_tokens in ((0, 0), (2, 1)):
+            index = 0
+            while index < len(item_tokens):
+                expected = _greedy_item_split(item_tokens, threshold, index, base_tokens, separator_tokens)
+                actual = BatchingUtils.split_by_item_tokens(
+                    item_tokens, threshold, index, base_tokens, separator_tokens
+                )
+                assert actual == expected, (threshold, index, actual, expected)
+                assert actual[0] > index
+                index = actual[0]
+
+
+def test_split_by_item_tokens_edges():
+    """空输入、起始索引在末尾/越界、首项超过阈值"""
+    assert BatchingUtils.split_by_item_tokens([], 100) == (0, 0)
+    assert BatchingUtils.split_by_item_tokens([5, 5], 100, start_index=2) == (2, 0)
+    assert BatchingUtils.split_by_item_tokens([5, 5], 100, start_index=5) == (5, 0)
+    assert BatchingUtils.split_by_item_tokens([5, 7], 100, start_index=1) == (2, 7)
+    assert BatchingUtils.split_by_item_tokens([500, 5], 100) == (1, 500)
+    assert BatchingUtils.split_by_item_tokens([5, 500, 5], 100) == (1, 5)
+
+
+def test_split_test_cases_matches_greedy():
+    """预计算单用例token数与现场计数两种方式，批次边界都与旧的贪心分批一致，且每批不超预算"""
+    test_cases = _make_cases(300)
+    for token_counter in (get_token_counter(), _CharCounter()):
+        for budget in (64, 300, 1600, 5000, 10 ** 6):
+            evaluator = _make_evaluator(token_counter, budget)
+            for case_tokens in (evaluator.estimate_case_tokens(test_cases), None):
+                index = 0
+                while index < len(test_cases):
+                    batch, next_index = _split(evaluator, test_cases, index, case_tokens)
+                    expected_batch, expected_next = _greedy_case_split(evaluator, test_cases, index)
+                    assert (len(batch), next_index) == (len(expected_batch), expected_next), (
+                        type(token_counter).__name__, budget, index
+                    )
+                    assert batch == test_cases[index:next_index]
+                    assert len(batch) == 1 or evaluator.estimate_batch_tokens(batch) <= budget
+                    index = next_index
+
+
+def test_split_test_cases_edges():
+    """空输入、起始索引靠近末尾、单个超预算用例"""
+    test_cases = _make_cases(10)
+    evaluator = _make_evaluator(_CharCounter(), 300)
+    case_tokens = evaluator.estimate_case_tokens(test_cases)
+
+    for tokens in ([], None):
+        assert _split(evaluator, [], 0, tokens) == ([], 0)
+    for tokens in (case_tokens, None):
+        assert _split(evaluator, test_cases, len(test_cases), tokens) == ([], len(test_cases))
+        batch, next_index = _split(evaluator, test_cases, len(test_cases) - 1, tokens)
+        assert batch == test_cases[-1:] and next_index == len(test_cases)
+
+    # 单个用例即超过预算时仍单独成批，保证分批前进
+    huge_case = {'test_case_id': 'huge', 'step_description': '步骤' * 1000}
+    mixed_cases = [huge_case] + test_cases[:3]
+    for tokens in (evaluator.estimate_case_tokens(mixed_cases), None):
+        batch, next_index = _split(evaluator, mixed_cases, 0, tokens)
+        assert batch == [huge_case] and next_index == 1
+        batch, next_index = _split(evaluator, mixed_cases, 1, tokens)
+        assert batch == _greedy_case_split(evaluator, mixed_cases, 1)[0]
+    for tokens in (evaluator.estimate_case_tokens([huge_case]), None):
+        assert _split(evaluator, [huge_case], 0, tokens) == ([huge_case], 1)
+
+
+if __name__ == "__main__":
+    for test in (test_split_by_item_tokens, test_split_by_item_tokens_edges,
+                 test_split_test_cases_matches_greedy, test_split_test_cases_edges):
+        test()
+        print(f"SUCCESS: {test.__name__}")
@@ -0,0 +1,55 @@
+"""
+测试历史需求知识库的关键词提取：HTML描述需先清理为纯文本再分词
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from mcp_tools.knowledge_base import (
+    HistoryRequirementKnowledgeBase,
+    _analyze_story,
+    _extract_keywords_batch,
+)
+
+HTML_STORY = {
+    'id': '1001',
+    'name': '订单',
+    'description': '<div><span style="color:rgb(0,0,0)">支持订单导出&nbsp;Excel</span></div>',
+}
+MARKUP_TOKENS = {'div', 'span', 'style', 'color', 'rgb', 'nbsp'}
+
+
+def _clean(stories):
+    return [HistoryRequirementKnowledgeBase._extract_text_from_html(s.get('description', '')) for s in stories]
+
+
+def test_keywords_ignore_html_markup():
+    """标签名、样式与实体名不应占用关键词名额"""
+    stories = [HTML_STORY, {'id': '1002', 'name': '登录', 'description': ''}]
+    keywords = _extract_keywords_batch(stories, _clean(stories))
+
+    assert len(keywords) == 2
+    assert keywords[0] == ['订单', '导出', 'Excel']
+    assert not MARKUP_TOKENS & set(keywords[0])
+    assert keywords[1] == ['登录']
+
+
+def test_analyze_story_uses_cleaned_description():
+    """分析结果使用批量清理后的描述，不再重复解析HTML"""
+    description = _clean([HTML_STORY])[0]
+    result = _analyze_story((HTML_STORY, description, ['订单']), suggestions_by_type={}, analysis_time='t')
+
+    assert result.description_preview == '支持订单导出 Excel'
+    assert result.keywords == ['订单']
+
+
+if __name__ == "__main__":
+    for test in (test_keywords_ignore_html_markup, test_analyze_story_uses_cleaned_description):
+        test()
+        print(f"SUCCESS: {test.__name__}")
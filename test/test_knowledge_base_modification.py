@@ -64,7 +64,7 @@ def test_knowledge_base_config():
             kb_data = json.load(f)
         
         # 检查必要字段
-        required_fields = ['requirements_analysis', 'test_case_templates', 'feature_types', 
+        required_fields = ['requirements_jsonl', 'test_case_templates', 'feature_types', 
                           'keywords_mapping', 'total_count', 'last_updated']
         
         missing_fields = [field for field in required_fields if field not in kb_data]
@@ -74,7 +74,12 @@ def test_knowledge_base_config():
         if missing_fields:
             print(f"❌ 缺少字段: {missing_fields}")
         
-        req_count = len(kb_data.get('requirements_analysis', []))
+        # 需求分析结果逐条存储在 JSONL 文件中
+        requirements_file = config_file.parent / kb_data.get('requirements_jsonl', '')
+        req_count = 0
+        if requirements_file.is_file():
+            with open(requirements_file, 'r', encoding='utf-8') as f:
+                req_count = sum(1 for line in f if line.strip())
         print(f"✓ 需求分析数量: {req_count}")
         print(f"✓ 最后更新时间: {kb_data.get('last_updated', '未设置')}")
         
@@ -0,0 +1,200 @@
+"""
+测试LLM请求限流：TokenBucket 的 RPM/TPM 令牌桶等待、429重试等待时间（_retry_after_seconds）
+与 APIManager._post_with_rate_limit_retry 的重试流程
+
+time.monotonic 与 asyncio.sleep 均被替换为假时钟，测试不会真正等待
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from mcp_tools import common_utils
+from mcp_tools.common_utils import APIManager, TokenBucket, _retry_after_seconds
+
+
+class _FakeClock:
+    """假时钟：sleep 只记录等待时间并推进 monotonic"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def patch(self):
+        return mock.patch.multiple(
+            common_utils,
+            time=mock.Mock(monotonic=self.monotonic, time=common_utils.time.time),
+            asyncio=mock.Mock(sleep=self.sleep),
+        )
+
+
+def _acquire_all(bucket, clock, costs):
+    """依次申请额度，返回每次申请的等待秒数（不等待时为0）"""
+    async def run():
+        waits = []
+        for cost in costs:
+            before = len(clock.sleeps)
+            await bucket.acquire(cost)
+            waits.append(clock.sleeps[-1] if len(clock.sleeps) > before else 0)
+        return waits
+    return asyncio.run(run())
+
+
+def test_disabled_without_env_limits():
+    """未设置 LLM_RPM_LIMIT / LLM_TPM_LIMIT 时不限流"""
+    with mock.patch.dict(os.environ, {}, clear=True), \
+            mock.patch.object(common_utils, "_global_rate_limiter", None):
+        limiter = common_utils.get_rate_limiter()
+        assert not limiter.enabled
+    with mock.patch.dict(os.environ, {"LLM_RPM_LIMIT": "60", "LLM_TPM_LIMIT": "abc"}, clear=True), \
+            mock.patch.object(common_utils, "_global_rate_limiter", None):
+        limiter = common_utils.get_rate_limiter()
+        assert limiter.enabled and limiter.rpm == 60 and limiter.tpm is None
+
+    clock = _FakeClock()
+    with clock.patch():
+        bucket = TokenBucket()
+        assert _acquire_all(bucket, clock, [10 ** 9] * 5) == [0] * 5
+
+
+def test_rpm_wait():
+    """RPM=60时每秒回填1个请求：桶空后每个请求需要多等待1秒"""
+    clock = _FakeClock()
+    with clock.patch():
+        bucket = TokenBucket(rpm=60)
+        assert _acquire_all(bucket, clock, [0] * 60) == [0] * 60
+        assert _acquire_all(bucket, clock, [0]) == [1.0]
+        # 等待期间回填的额度已被本次请求用掉，下一个请求继续等待
+        assert _acquire_all(bucket, clock, [0]) == [1.0]
+        # 空闲一分钟后桶重新回满（不超过容量）
+        clock.now += 120
+        assert _acquire_all(bucket, clock, [0] * 60) == [0] * 60
+
+
+def test_tpm_wait():
+    """TPM=600时每秒回填10个token：欠额按回填速率折算为等待时间"""
+    clock = _FakeClock()
+    with clock.patch():
+        bucket = TokenBucket(tpm=600)
+        assert _acquire_all(bucket, clock, [500, 100]) == [0, 0]
+        assert _acquire_all(bucket, clock, [30]) == [3.0]
+        clock.now += 1  # 回填10个token
+        assert _acquire_all(bucket, clock, [20]) == [1.0]
+
+
+def test_cost_capped_to_bucket():
+    """单次预计消耗超过整桶容量时按整桶计，等待不超过一分钟"""
+    clock = _FakeClock()
+    with clock.patch():
+        bucket = TokenBucket(tpm=600)
+        assert _acquire_all(bucket, clock, [10 ** 6]) == [0]
+        assert _acquire_all(bucket, clock, [10 ** 6]) == [60.0]
+        assert _acquire_all(bucket, clock, [-5]) == [0]
+
+
+def test_rpm_and_tpm_take_longer_wait():
+    """同时限制RPM与TPM时取两者中较长的等待"""
+    clock = _FakeClock()
+    with clock.patch():
+        bucket = TokenBucket(rpm=1, tpm=600)
+        assert _acquire_all(bucket, clock, [600]) == [0]
+        assert _acquire_all(bucket, clock, [10]) == [60.0]
+
+
+def test_retry_after_seconds():
+    """数字 Retry-After 直接使用；缺失或HTTP日期格式时指数退避；等待不超过30秒"""
+    assert _retry_after_seconds("2", 0) == 2.0
+    assert _retry_after_seconds("0.5", 3) == 0.5
+    assert _retry_after_seconds("-1", 0) == 0.0
+    assert _retry_after_seconds(None, 0) == 0.5
+    assert _retry_after_seconds("", 2) == 2.0
+    assert _retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT", 1) == 1.0
+    assert _retry_after_seconds("120", 0) == common_utils._LLM_RATE_LIMIT_MAX_DELAY == 30.0
+    assert _retry_after_seconds(None, 10) == 30.0
+
+
+class _FakeResponse:
+    def __init__(self, status, retry_after=None):
+        self.status = status
+        self.headers = {"Retry-After": retry_after} if retry_after is not None else {}
+        self.released = False
+
+    def release(self):
+        self.released = True
+
+
+class _FakeSession:
+    """按顺序返回预设响应的假会话"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    async def post(self, url, json=None, headers=None, timeout=None):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+def _post(session, clock):
+    api_manager = object.__new__(APIManager)
+    with clock.patch():
+        return asyncio.run(api_manager._post_with_rate_limit_retry(session, "http://llm/chat", {}, {}))
+
+
+def test_post_retries_on_429():
+    """429时释放响应并按 Retry-After 等待后重试，成功后返回成功响应"""
+    clock = _FakeClock()
+    first, second = _FakeResponse(429, "2"), _FakeResponse(429)
+    ok = _FakeResponse(200)
+    session = _FakeSession([first, second, ok])
+
+    assert _post(session, clock) is ok
+    assert session.calls == 3
+    assert clock.sleeps == [2.0, 1.0]
+    assert first.released and second.released and not ok.released
+
+
+def test_post_returns_last_429_when_retries_exhausted():
+    """重试次数用尽后返回最后一次429响应（不释放），由调用方处理"""
+    clock = _FakeClock()
+    retries = common_utils._LLM_RATE_LIMIT_MAX_RETRIES
+    responses = [_FakeResponse(429, "60") for _ in range(retries + 1)]
+    session = _FakeSession(responses)
+
+    assert _post(session, clock) is responses[-1]
+    assert session.calls == retries + 1
+    assert clock.sleeps == [30.0] * retries
+    assert not responses[-1].released
+
+
+def test_post_does_not_retry_other_errors():
+    """非429错误直接返回，不等待"""
+    clock = _FakeClock()
+    error = _FakeResponse(500)
+    session = _FakeSession([error])
+
+    assert _post(session, clock) is error
+    assert session.calls == 1 and clock.sleeps == []
+
+
+if __name__ == "__main__":
+    for test in (test_disabled_without_env_limits, test_rpm_wait, test_tpm_wait, test_cost_capped_to_bucket,
+                 test_rpm_and_tpm_take_longer_wait, test_retry_after_seconds, test_post_retries_on_429,
+                 test_post_returns_last_429_when_retries_exhausted, test_post_does_not_retry_other_errors):
+        test()
+        print(f"SUCCESS: {test.__name__}")
@@ -0,0 +1,202 @@
+"""
+测试LLM响应磁盘缓存（ResponseCache）：缓存键、各缓存模式下的读写删、过期与条目上限清理，
+以及评估器在批次解析后写入/删除缓存的处理（_settle_cached_response）
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from mcp_tools import common_utils
+from mcp_tools.common_utils import ResponseCache
+from mcp_tools.test_case_evaluator import TestCaseEvaluator
+
+KEY = ResponseCache.make_key("prompt", "model", 8000)
+
+
+class _TempConfig:
+    """只提供 local_data_path 的配置对象，缓存写入临时目录"""
+
+    def __init__(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.local_data_path = Path(self._tmp.name)
+
+    def cleanup(self):
+        self._tmp.cleanup()
+
+
+def _cache_files(cache: ResponseCache):
+    if not cache.cache_dir.exists():
+        return []
+    return sorted(p.name for p in cache.cache_dir.iterdir())
+
+
+def test_make_key():
+    """缓存键确定且对每个字段敏感，字段拼接不产生歧义"""
+    assert KEY == ResponseCache.make_key("prompt", "model", 8000)
+    assert len(KEY) == 64
+    assert KEY == ResponseCache.make_key("prompt", "model", 8000, common_utils._LLM_TEMPERATURE)
+    others = {
+        ResponseCache.make_key("prompt2", "model", 8000),
+        ResponseCache.make_key("prompt", "model2", 8000),
+        ResponseCache.make_key("prompt", "model", 4000),
+        ResponseCache.make_key("prompt", "model", 8000, temperature=0.7),
+        ResponseCache.make_key("promptm", "odel", 8000),
+    }
+    assert KEY not in others and len(others) == 5
+
+
+def test_modes():
+    """enabled 读写；read_only/replay 只读；write_only 只写；disabled 不读不写"""
+    config = _TempConfig()
+    try:
+        writer = ResponseCache(config, "write_only")
+        writer.put(KEY, "响应", "model", 8000)
+        assert writer.get(KEY) is None
+        assert _cache_files(writer) == [f"{KEY}.json"]
+
+        for mode in ("enabled", "read_only", "replay"):
+            assert ResponseCache(config, mode).get(KEY) == "响应"
+        assert ResponseCache(config, "disabled").get(KEY) is None
+
+        # 只读模式不写入也不删除
+        for mode in ("read_only", "replay", "disabled"):
+            cache = ResponseCache(config, mode)
+            cache.put(KEY, "新响应", "model", 8000)
+            cache.discard(KEY)
+        assert ResponseCache(config, "enabled").get(KEY) == "响应"
+
+        enabled = ResponseCache(config, "enabled")
+        enabled.put(KEY, "新响应", "model", 8000)
+        assert enabled.get(KEY) == "新响应"
+        enabled.discard(KEY)
+        assert enabled.get(KEY) is None
+        assert _cache_files(enabled) == []
+        enabled.discard(KEY)  # 删除不存在的条目不报错
+    finally:
+        config.cleanup()
+
+
+def test_mode_normalization():
+    """模式名大小写与连字符归一；未知模式回退为 enabled；未指定时读取 LLM_CACHE_MODE"""
+    config = _TempConfig()
+    try:
+        assert ResponseCache(config, "Read-Only").mode == "read_only"
+        assert ResponseCache(config, "bogus").mode == "enabled"
+        with mock.patch.dict(os.environ, {"LLM_CACHE_MODE": "replay"}):
+            assert ResponseCache(config).mode == "replay"
+        with mock.patch.dict(os.environ, {}, clear=True):
+            assert ResponseCache(config).mode == "enabled"
+    finally:
+        config.cleanup()
+
+
+def test_entry_content_and_broken_entry():
+    """条目只保存响应与请求参数，不保存提示词原文；损坏的条目视为未命中"""
+    config = _TempConfig()
+    try:
+        cache = ResponseCache(config, "enabled")
+        cache.put(KEY, "响应", "model", 8000)
+        entry = common_utils._read_json_file(str(cache.cache_dir / f"{KEY}.json"))
+        assert entry["response"] == "响应"
+        assert entry["model"] == "model" and entry["max_tokens"] == 8000
+        assert "prompt" not in entry
+
+        (cache.cache_dir / f"{KEY}.json").write_text("{broken", encoding="utf-8")
+        assert cache.get(KEY) is None
+    finally:
+        config.cleanup()
+
+
+def test_expiry_and_prune():
+    """过期条目视为未命中并在写入时清理；条目超过上限时只保留最新的若干条"""
+    config = _TempConfig()
+    try:
+        cache = ResponseCache(config, "enabled")
+        cache.put(KEY, "响应", "model", 8000)
+        expired = time.time() - (common_utils._LLM_CACHE_MAX_AGE_DAYS + 1) * 86400
+        os.utime(cache.cache_dir / f"{KEY}.json", (expired, expired))
+        assert cache.get(KEY) is None
+
+        keys = [ResponseCache.make_key(f"prompt{i}", "model", 8000) for i in range(4)]
+        now = time.time()
+        for i, key in enumerate(keys):
+            cache.put(key, f"响应{i}", "model", 8000)
+            # 显式设置递增的修改时间，避免文件系统时间精度影响排序
+            os.utime(cache.cache_dir / f"{key}.json", (now + i, now + i))
+        # 过期条目已在写入时清理
+        assert _cache_files(cache) == sorted(f"{key}.json" for key in keys)
+
+        with mock.patch.object(common_utils, "_LLM_CACHE_MAX_ENTRIES", 2):
+            cache._prune()
+
+        assert _cache_files(cache) == sorted(f"{key}.json" for key in keys[-2:])
+        assert cache.get(keys[-1]) == "响应3"
+    finally:
+        config.cleanup()
+
+
+def _make_evaluator(cache: ResponseCache) -> TestCaseEvaluator:
+    """跳过初始化（需求单、规则与token预算），只保留缓存处理需要的属性"""
+    evaluator = object.__new__(TestCaseEvaluator)
+    evaluator.response_cache = cache
+    evaluator.max_context_tokens = 8000
+    evaluator._pending_cache_entries = {}
+    return evaluator
+
+
+def test_settle_cached_response():
+    """新响应解析成功才写入；缓存响应解析失败则删除；不匹配的批次不处理"""
+    config = _TempConfig()
+    try:
+        cache = ResponseCache(config, "enabled")
+        evaluator = _make_evaluator(cache)
+        batch = [{"test_case_id": "1"}]
+
+        # 新响应解析失败：不写入
+        evaluator._pending_cache_entries[id(batch)] = (batch, KEY, "model", "无法解析", False)
+        evaluator._settle_cached_response(batch, parsed_ok=False)
+        assert cache.get(KEY) is None and not evaluator._pending_cache_entries
+
+        # 新响应解析成功：写入
+        evaluator._pending_cache_entries[id(batch)] = (batch, KEY, "model", "表格", False)
+        evaluator._settle_cached_response(batch, parsed_ok=True)
+        assert cache.get(KEY) == "表格" and not evaluator._pending_cache_entries
+
+        # 缓存响应解析成功：保留
+        evaluator._pending_cache_entries[id(batch)] = (batch, KEY, "model", "表格", True)
+        evaluator._settle_cached_response(batch, parsed_ok=True)
+        assert cache.get(KEY) == "表格"
+
+        # 同id但不是同一个批次对象：只移除登记，不处理缓存
+        other_batch = [{"test_case_id": "2"}]
+        evaluator._pending_cache_entries[id(batch)] = (other_batch, KEY, "model", "表格", True)
+        evaluator._settle_cached_response(batch, parsed_ok=False)
+        assert cache.get(KEY) == "表格" and not evaluator._pending_cache_entries
+
+        # 未登记的批次：不处理
+        evaluator._settle_cached_response(batch, parsed_ok=False)
+        assert cache.get(KEY) == "表格"
+
+        # 缓存响应解析失败：删除
+        evaluator._pending_cache_entries[id(batch)] = (batch, KEY, "model", "表格", True)
+        evaluator._settle_cached_response(batch, parsed_ok=False)
+        assert cache.get(KEY) is None and not evaluator._pending_cache_entries
+    finally:
+        config.cleanup()
+
+
+if __name__ == "__main__":
+    for test in (test_make_key, test_modes, test_mode_normalization, test_entry_content_and_broken_entry,
+                 test_expiry_and_prune, test_settle_cached_response):
+        test()
+        print(f"SUCCESS: {test.__name__}")